@@ -1,7 +1,18 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
-from celery.signals import task_postrun
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_init,
+    worker_process_init,
+)
+
+from app import settings
+from app.services import celery_telemetry
 
 # Устанавливаем стандартный модуль настроек Django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
@@ -43,9 +54,43 @@ def debug_task(self):
     print(f"Request: {self.request!r}")
 
 
+@task_prerun.connect
 @task_postrun.connect
 def close_db_connection(**kwargs):
-    from django.db import connections
+    from django.db import close_old_connections
 
-    for conn in connections.all():
-        conn.close()
+    # Как на каждом HTTP-запросе: закрываются только сломанные и устаревшие
+    # (CONN_MAX_AGE) соединения, остальные переиспользуются следующей задачей.
+    # В режиме пула (DB_POOL_ENABLED) соединение возвращается в пул
+    close_old_connections()
+
+
+@task_postrun.connect
+def flush_async_bridge(**kwargs):
+    from websocket.services.async_bridge import async_bridge
+
+    # Отправки задачи без ожидания (fire_and_forget) уходят до следующей
+    # задачи и до перезапуска процесса (max_tasks_per_child)
+    async_bridge.flush()
+
+
+# Телеметрия задач (app/services/celery_telemetry.py): время выполнения,
+# ожидание в очереди, повторы, прирост RSS и время запросов к БД
+if settings.CELERY_TELEMETRY_ENABLED:
+    before_task_publish.connect(celery_telemetry.on_before_task_publish)
+    task_prerun.connect(celery_telemetry.on_task_prerun)
+    task_postrun.connect(celery_telemetry.on_task_postrun)
+    task_failure.connect(celery_telemetry.on_task_failure)
+    task_retry.connect(celery_telemetry.on_task_retry)
+
+
+@worker_init.connect
+@worker_process_init.connect
+def telemetry_worker_init(**kwargs):
+    from django.db.backends.signals import connection_created
+
+    # Время запросов к БД считается только в процессах воркера
+    if settings.CELERY_TELEMETRY_ENABLED:
+        connection_created.connect(
+            celery_telemetry.on_connection_created, dispatch_uid="celery_telemetry"
+        )
@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import resource
+import threading
+import time
+
+from app import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_KEY_PREFIX = "celery_telemetry:"
+TASK_NAMES_KEY = f"{TELEMETRY_KEY_PREFIX}tasks"
+
+# Заголовок сообщения со временем публикации задачи
+PUBLISHED_AT_HEADER = "published_at"
+
+# Границы корзин (сек) для времени выполнения и ожидания в очереди
+TIME_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+# Окна (минуты), за которые отдаётся сводка
+DEFAULT_WINDOWS = (1, 5, 15, 60)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes() -> int:
+    """Текущий RSS процесса (на Linux), иначе пиковый"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _DbTimer:
+    """
+    Суммарное время запросов к БД процесса воркера.
+
+    Обёртка ставится на каждое новое соединение Django, а prefork-воркер
+    выполняет одну задачу за раз, поэтому сумма за время задачи - это
+    запросы задачи из всех её потоков.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.total += elapsed
+
+
+db_timer = _DbTimer()
+
+# {task_id: (время старта, RSS, время БД на старте)}
+_running: dict[str, tuple[float, int, float]] = {}
+
+
+def _bucket_field(prefix: str, seconds: float) -> str:
+    for bound in TIME_BUCKETS:
+        if seconds <= bound:
+            return f"{prefix}_le_{bound}"
+    return f"{prefix}_le_inf"
+
+
+def _minute_key(task_name: str, minute: int) -> str:
+    return f"{TELEMETRY_KEY_PREFIX}{task_name}:{minute}"
+
+
+def _record(task_name: str, fields: dict[str, float]) -> None:
+    minute = int(time.time() // 60)
+    key = _minute_key(task_name, minute)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for field, value in fields.items():
+            if isinstance(value, int):
+                pipe.hincrby(key, field, value)
+            else:
+                pipe.hincrbyfloat(key, field, value)
+        pipe.expire(key, settings.CELERY_TELEMETRY_RETENTION * 60)
+        pipe.sadd(TASK_NAMES_KEY, task_name)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to record telemetry for {task_name}: {e}")
+
+
+# Обработчики сигналов Celery (подключаются в app/celery.py)
+
+
+def on_before_task_publish(headers=None, **kwargs) -> None:
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+def on_connection_created(connection=None, **kwargs) -> None:
+    if db_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_timer)
+
+
+def on_task_prerun(task_id=None, task=None, **kwargs) -> None:
+    _running[task_id] = (time.perf_counter(), _rss_bytes(), db_timer.total)
+
+    published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+    if published_at is None:
+        published_at = (task.request.headers or {}).get(PUBLISHED_AT_HEADER)
+    if published_at:
+        wait = max(time.time() - float(published_at), 0.0)
+        _record(
+            task.name,
+            {
+                "queue_wait_sum": wait,
+                "queue_wait_count": 1,
+                _bucket_field("queue_wait", wait): 1,
+            },
+        )
+
+
+def on_task_postrun(task_id=None, task=None, state=None, **kwargs) -> None:
+    started = _running.pop(task_id, None)
+    if started is None:
+        return
+    started_at, rss, db_time = started
+    runtime = time.perf_counter() - started_at
+    _record(
+        task.name,
+        {
+            "count": 1,
+            f"state_{state or 'UNKNOWN'}": 1,
+            "runtime_sum": runtime,
+            _bucket_field("runtime", runtime): 1,
+            "rss_delta_sum": _rss_bytes() - rss,
+            "db_time_sum": db_timer.total - db_time,
+        },
+    )
+
+
+def on_task_failure(sender=None, **kwargs) -> None:
+    _record(sender.name, {"failures": 1})
+
+
+def on_task_retry(sender=None, **kwargs) -> None:
+    _record(sender.name, {"retries": 1})
+
+
+# Чтение сводки
+
+
+def _percentile(values: dict[str, float], prefix: str, q: float) -> float | None:
+    total = sum(values.get(f"{prefix}_le_{bound}", 0) for bound in (*TIME_BUCKETS, "inf"))
+    if not total:
+        return None
+    seen = 0
+    for bound in (*TIME_BUCKETS, "inf"):
+        seen += values.get(f"{prefix}_le_{bound}", 0)
+        if seen >= q * total:
+            return float(bound)
+    return None
+
+
+def _summarize(values: dict[str, float], window: int) -> dict:
+    count = int(values.get("count", 0))
+    waits = int(values.get("queue_wait_count", 0))
+    return {
+        "count": count,
+        "states": {
+            field.removeprefix("state_"): int(value)
+            for field, value in values.items()
+            if field.startswith("state_")
+        },
+        "failures": int(values.get("failures", 0)),
+        "retries": int(values.get("retries", 0)),
+        "runtime_avg": round(values.get("runtime_sum", 0) / count, 3) if count else None,
+        "runtime_p95": _percentile(values, "runtime", 0.95),
+        "queue_wait_avg": round(values.get("queue_wait_sum", 0) / waits, 3) if waits else None,
+        "queue_wait_p95": _percentile(values, "queue_wait", 0.95),
+        "rss_delta_avg": int(values.get("rss_delta_sum", 0) / count) if count else None,
+        "db_time_avg": round(values.get("db_time_sum", 0) / count, 3) if count else None,
+        # Сколько слотов воркеров в среднем занимали задачи этого типа
+        "busy_slots": round(values.get("runtime_sum", 0) / (window * 60), 3),
+    }
+
+
+def get_task_telemetry(windows: tuple[int, ...] = DEFAULT_WINDOWS) -> dict:
+    """
+    Сводка по именам задач за последние windows минут:
+    {имя задачи: {"5m": {...}, ...}}
+    """
+    redis = get_redis()
+    task_names = sorted(redis.smembers(TASK_NAMES_KEY))
+    longest = max(windows)
+    now_minute = int(time.time() // 60)
+
+    pipe = redis.pipeline(transaction=False)
+    for name in task_names:
+        for minute in range(now_minute - longest + 1, now_minute + 1):
+            pipe.hgetall(_minute_key(name, minute))
+    rows = iter(pipe.execute())
+
+    result = {}
+    for name in task_names:
+        # Минутные корзины от старых к новым
+        minutes = [next(rows) for _ in range(longest)]
+        result[name] = {}
+        for window in windows:
+            values: dict[str, float] = {}
+            for row in minutes[-window:]:
+                for field, value in row.items():
+                    values[field] = values.get(field, 0) + float(value)
+            result[name][f"{window}m"] = _summarize(values, window)
+    return result
+
+
+# Глубина очередей брокера
+
+
+def _priority_keys(queue: str) -> dict[int, str]:
+    """Ключи Redis очереди по шагам приоритета (как их называет kombu)"""
+    options = settings.CELERY_BROKER_TRANSPORT_OPTIONS
+    return {
+        step: f"{queue}{options['sep']}{step}" if step else queue
+        for step in options["priority_steps"]
+    }
+
+
+def _published_at(message: str | None) -> float | None:
+    try:
+        return float(json.loads(message)["headers"][PUBLISHED_AT_HEADER])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+def get_queue_depths(
+    queues: tuple[str, ...] = (
+        settings.CELERY_REALTIME_QUEUE,
+        settings.CELERY_TASK_DEFAULT_QUEUE,
+        settings.CELERY_BULK_QUEUE,
+    ),
+) -> dict:
+    """
+    Глубина очередей брокера: {очередь: {"depth": всего сообщений,
+    "by_priority": {приоритет: сообщений}, "oldest_wait": сколько секунд
+    ждёт самое старое сообщение}}
+    """
+    redis = get_redis()
+    keys = {queue: _priority_keys(queue) for queue in queues}
+
+    pipe = redis.pipeline(transaction=False)
+    for queue_keys in keys.values():
+        for key in queue_keys.values():
+            # Сообщения добавляются LPUSH и забираются с конца списка
+            pipe.llen(key)
+            pipe.lindex(key, -1)
+    rows = iter(pipe.execute())
+
+    now = time.time()
+    result = {}
+    for queue, queue_keys in keys.items():
+        by_priority = {}
+        oldest = None
+        for step in queue_keys:
+            depth, message = next(rows), next(rows)
+            if not depth:
+                continue
+            by_priority[step] = depth
+            published_at = _published_at(message)
+            if published_at is not None:
+                oldest = published_at if oldest is None else min(oldest, published_at)
+        result[queue] = {
+            "depth": sum(by_priority.values()),
+            "by_priority": by_priority,
+            "oldest_wait": round(max(now - oldest, 0.0), 3) if oldest else None,
+        }
+    return result
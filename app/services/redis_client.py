@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+import redis
+import redis.asyncio
+
+from app import settings
+
+logger = logging.getLogger(__name__)
+
+_client: redis.Redis | None = None
+_async_client: redis.asyncio.Redis | None = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Общий синхронный клиент Redis для процесса.
+    Пул соединений redis-py сам пересоздаётся после fork воркера Celery.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL, decode_responses=True, **settings.REDIS_OPTIONS
+        )
+    return _client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """
+    Общий асинхронный клиент Redis для event loop ASGI-процесса.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = redis.asyncio.Redis.from_url(
+            settings.REDIS_URL, decode_responses=True, **settings.REDIS_OPTIONS
+        )
+    return _async_client
+
+
+class PubSubDispatcher:
+    """
+    Одно соединение Redis pub/sub и один поток на процесс для всех
+    подписчиков.
+
+    Модули регистрируют обработчик канала через subscribe(), поток
+    подписывается на все зарегистрированные каналы и передаёт каждому
+    обработчику данные его сообщений. on_connect канала вызывается после
+    каждой (пере)подписки - для событий, пропущенных пока подписки не было.
+    """
+
+    # Как часто поток проверяет новые каналы, пока сообщений нет (секунд)
+    poll_timeout = 1.0
+
+    def __init__(self) -> None:
+        # {канал: (обработчик сообщения, обработчик подписки)}
+        self._handlers: dict[str, tuple[Callable[[str], None], Callable[[], None] | None]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid = None
+
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        on_connect: Callable[[], None] | None = None,
+    ) -> None:
+        """Регистрирует обработчик канала. Поток запускается ensure_running()"""
+        with self._lock:
+            self._handlers[channel] = (handler, on_connect)
+
+    def ensure_running(self) -> None:
+        # После fork воркера Celery поток родителя в дочернем процессе не существует
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="redis-pubsub", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                subscribed = set()
+                while True:
+                    with self._lock:
+                        handlers = dict(self._handlers)
+                    if channels := handlers.keys() - subscribed:
+                        pubsub.subscribe(*channels)
+                        subscribed |= channels
+                        for channel in channels:
+                            self._call(channel, handlers[channel][1])
+
+                    message = pubsub.get_message(timeout=self.poll_timeout)
+                    if message and message["type"] == "message":
+                        channel = message["channel"]
+                        self._call(channel, handlers[channel][0], message["data"])
+            except Exception as e:
+                logger.error(f"Redis pub/sub dispatcher error: {e}")
+                time.sleep(1)
+
+    @staticmethod
+    def _call(channel: str, handler: Callable | None, *args) -> None:
+        # Ошибка одного подписчика не должна обрывать подписку остальных
+        if handler is None:
+            return
+        try:
+            handler(*args)
+        except Exception as e:
+            logger.error(f"Redis pub/sub handler for {channel} failed: {e}")
+
+
+pubsub_dispatcher = PubSubDispatcher()
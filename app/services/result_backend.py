@@ -0,0 +1,172 @@
+import logging
+from datetime import datetime, timezone
+from functools import cached_property
+
+from celery import states
+from celery.backends.redis import RedisBackend
+from kombu.utils.encoding import bytes_to_str
+
+from app import settings
+
+logger = logging.getLogger(__name__)
+
+# Список ID завершённых задач, ещё не перенесённых в БД
+ARCHIVE_QUEUE_KEY = "celery_results:archive"
+ARCHIVE_LOCK_KEY = "celery_results:archive_lock"
+
+# Поля TaskResult, которые обновляются, если запись уже есть в БД
+ARCHIVE_UPDATE_FIELDS = (
+    "status",
+    "result",
+    "content_type",
+    "content_encoding",
+    "meta",
+    "traceback",
+    "task_name",
+    "task_args",
+    "task_kwargs",
+    "worker",
+    "periodic_task_name",
+    "date_started",
+)
+
+
+class HybridResultBackend(RedisBackend):
+    """
+    Результаты задач в два уровня.
+
+    Все переходы состояний (STARTED, RETRY, SUCCESS...) пишутся только
+    в Redis с TTL CELERY_RESULT_REDIS_TTL. ID завершённых задач попадают
+    в список ARCHIVE_QUEUE_KEY, откуда archive() пачками переносит
+    результаты в TaskResult (django_celery_results) для истории.
+    Если в Redis записи нет (TTL истёк), статус читается из БД, а
+    удаляются старые записи БД как раньше - задачей celery.backend_cleanup.
+    """
+
+    # Нужен celery.backend_cleanup в beat для чистки истории в БД
+    supports_autoexpire = False
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("expires", settings.CELERY_RESULT_REDIS_TTL)
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def database(self):
+        # Импорт моделей django_celery_results возможен только после django.setup()
+        from django_celery_results.backends import DatabaseBackend
+
+        return DatabaseBackend(app=self.app)
+
+    def _store_result(self, task_id, result, state, traceback=None, request=None, **kwargs):
+        result = super()._store_result(
+            task_id, result, state, traceback=traceback, request=request, **kwargs
+        )
+        if state in states.READY_STATES:
+            self.client.rpush(ARCHIVE_QUEUE_KEY, task_id)
+        return result
+
+    def _get_result_meta(self, result, state, traceback, request, format_date=True, encode=False):
+        meta = super()._get_result_meta(
+            result, state, traceback, request, format_date=format_date, encode=encode
+        )
+        # Поля TaskResult, которых нет в записи RedisBackend. Время старта
+        # запоминается в запросе задачи: он же передаётся при её завершении
+        if request is not None:
+            if state == states.STARTED:
+                request.date_started = datetime.now(timezone.utc).isoformat()
+            meta["date_started"] = getattr(request, "date_started", None)
+            meta["periodic_task_name"] = getattr(request, "periodic_task_name", None)
+        return meta
+
+    def get_task_meta(self, task_id, cache=True):
+        meta = super().get_task_meta(task_id, cache)
+        if meta["status"] == states.PENDING:
+            # В Redis нет записи: задача ещё не стартовала или уже только в истории
+            return self.database.get_task_meta(task_id, cache)
+        return meta
+
+    def _forget(self, task_id):
+        super()._forget(task_id)
+        self.database._forget(task_id)
+
+    def cleanup(self):
+        self.database.cleanup()
+
+    def archive(self, batch_size: int | None = None) -> int:
+        """
+        Переносит завершённые результаты из Redis в БД пачками
+        по batch_size. Возвращает количество перенесённых задач.
+        """
+        batch_size = batch_size or settings.CELERY_RESULT_ARCHIVE_BATCH_SIZE
+        lock = self.client.lock(ARCHIVE_LOCK_KEY, timeout=settings.CELERY_RESULT_ARCHIVE_LOCK_TIMEOUT)
+        if not lock.acquire(blocking=False):
+            logger.info("Task results archiving is already running")
+            return 0
+
+        archived = 0
+        try:
+            while task_ids := self.client.lrange(ARCHIVE_QUEUE_KEY, 0, batch_size - 1):
+                archived += self._archive_batch([bytes_to_str(task_id) for task_id in task_ids])
+                # ID снимаются со списка только после записи в БД
+                self.client.ltrim(ARCHIVE_QUEUE_KEY, len(task_ids), -1)
+        finally:
+            lock.release()
+        return archived
+
+    def _archive_batch(self, task_ids: list[str]) -> int:
+        from django_celery_results.models import TaskResult
+
+        # Одна задача может попасть в список несколько раз (повторное выполнение)
+        task_ids = list(dict.fromkeys(task_ids))
+        values = self.mget([self.get_key_for_task(task_id) for task_id in task_ids])
+
+        rows = []
+        dates_done = []
+        for task_id, value in zip(task_ids, values):
+            if not value:
+                logger.warning(f"Task result {task_id} expired before archiving")
+                continue
+            meta = self.decode(value)
+            rows.append(self._to_task_result(TaskResult, task_id, meta))
+            dates_done.append(_parse_date(meta.get("date_done")))
+
+        if rows:
+            TaskResult.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["task_id"],
+                update_fields=ARCHIVE_UPDATE_FIELDS,
+            )
+            # date_done - auto_now, bulk_create записывает в него время переноса.
+            # Настоящее время завершения задачи проставляется отдельно
+            for row, date_done in zip(rows, dates_done):
+                row.date_done = date_done or row.date_done
+            TaskResult.objects.bulk_update(rows, ["date_done"])
+        return len(rows)
+
+    def _to_task_result(self, model, task_id: str, meta: dict):
+        """Строка TaskResult в формате DatabaseBackend из записи Redis"""
+        encode = self.database.encode_content
+        content_type, content_encoding, result = encode(meta.get("result"))
+        _, _, encoded_meta = encode({"children": meta.get("children") or []})
+        task_args = meta.get("args")
+        task_kwargs = meta.get("kwargs")
+        return model(
+            task_id=task_id,
+            status=meta["status"],
+            result=result,
+            content_type=content_type,
+            content_encoding=content_encoding,
+            meta=encoded_meta,
+            traceback=meta.get("traceback"),
+            task_name=meta.get("name"),
+            task_args=encode(task_args)[2] if task_args is not None else None,
+            task_kwargs=encode(task_kwargs)[2] if task_kwargs is not None else None,
+            worker=meta.get("worker"),
+            periodic_task_name=meta.get("periodic_task_name"),
+            date_started=_parse_date(meta.get("date_started")),
+        )
+
+
+def _parse_date(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
@@ -138,17 +138,120 @@ WEBSOCKET_CONNECT_TIMEOUT = 3600  # 1 час
 WEBSOCKET_READ_TIMEOUT = 3600     # 1 час
 WEBSOCKET_WRITE_TIMEOUT = 3600    # 1 час
 
+# Broadcast-рассылка уведомлений
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.getenv("NOTIFICATION_FANOUT_CHUNK_SIZE", 1000))  # Пользователей на одно чтение из БД
+NOTIFICATION_FANOUT_CONCURRENCY = int(os.getenv("NOTIFICATION_FANOUT_CONCURRENCY", 100))  # Параллельных group_send
+# Через сколько дней broadcast удаляется, даже если его подтвердили не все получатели
+NOTIFICATION_BROADCAST_TTL_DAYS = int(os.getenv("NOTIFICATION_BROADCAST_TTL_DAYS", 90))
+
+# Сколько секунд ждать отправки в channel layer из задач Celery (websocket/services/async_bridge.py)
+CHANNEL_SEND_TIMEOUT = float(os.getenv("CHANNEL_SEND_TIMEOUT", 10))
+
+# Размер страницы недоставленных уведомлений, отправляемой при подключении
+NOTIFICATION_BACKLOG_PAGE_SIZE = int(os.getenv("NOTIFICATION_BACKLOG_PAGE_SIZE", 50))
+
+# Подтверждения доставки копятся в памяти соединения и пишутся в БД пачкой
+NOTIFICATION_ACK_FLUSH_INTERVAL = float(os.getenv("NOTIFICATION_ACK_FLUSH_INTERVAL", 1.0))  # Секунд
+NOTIFICATION_ACK_MAX_BUFFER = int(os.getenv("NOTIFICATION_ACK_MAX_BUFFER", 500))  # Сброс при переполнении
+
+# Heartbeat WebSocket-соединений: один таймер на процесс, соединения разбиты
+# на корзины, каждая корзина пингуется раз в WEBSOCKET_HEARTBEAT_INTERVAL секунд
+WEBSOCKET_HEARTBEAT_INTERVAL = int(os.getenv("WEBSOCKET_HEARTBEAT_INTERVAL", 30))
+WEBSOCKET_HEARTBEAT_BUCKETS = int(os.getenv("WEBSOCKET_HEARTBEAT_BUCKETS", 30))
+WEBSOCKET_HEARTBEAT_MAX_MISSED = int(os.getenv("WEBSOCKET_HEARTBEAT_MAX_MISSED", 2))  # Пропущенных pong до отключения
+
+# Добавлять в события channel layer готовый msgpack-кадр рядом с JSON.
+# Без этого кадр для msgpack-клиентов перекодируется в консьюмере
+WEBSOCKET_BINARY_FRAMES = str_to_bool(os.getenv("WEBSOCKET_BINARY_FRAMES", default=False))
+
+# Минимальный интервал между промежуточными обновлениями прогресса задачи (секунд)
+TASK_PROGRESS_PUBLISH_INTERVAL = float(os.getenv("TASK_PROGRESS_PUBLISH_INTERVAL", 0.15))
+
+# Время жизни снимка последнего состояния задачи в Redis (секунд)
+TASK_SNAPSHOT_TTL = int(os.getenv("TASK_SNAPSHOT_TTL", 60 * 60 * 24))
+
+# Время жизни флага отмены задачи в Redis (секунд)
+TASK_CANCEL_TTL = int(os.getenv("TASK_CANCEL_TTL", 60 * 60 * 24))
+
+# Через сколько секунд после отмены процесс задачи, не завершившейся сам, принудительно
+# останавливается (revoke с terminate). 0 - не останавливать
+TASK_CANCEL_TERMINATE_AFTER = int(os.getenv("TASK_CANCEL_TERMINATE_AFTER", 120))
+
+# Лимиты одновременных итераций BaseTaskRunner (по умолчанию, задача может переопределить).
+# Лимит подстраивается под задержку и ошибки внешнего сервиса в пределах MIN..MAX.
+# Каждый поток итерации держит своё соединение с БД: при DB_POOL_ENABLED лимит
+# дополнительно ограничен размером пула (см. BaseTaskRunner.max_concurrency).
+# INITIAL ниже MAX, чтобы на быстром сервисе было куда расти
+TASK_CONCURRENCY_INITIAL = int(os.getenv("TASK_CONCURRENCY_INITIAL", 8))
+TASK_CONCURRENCY_MIN = int(os.getenv("TASK_CONCURRENCY_MIN", 1))
+TASK_CONCURRENCY_MAX = int(os.getenv("TASK_CONCURRENCY_MAX", 16))
+
+# Размер части для задач, выполняемых частями на нескольких воркерах (BaseTaskRunner.chunked)
+TASK_CHUNK_SIZE = int(os.getenv("TASK_CHUNK_SIZE", 500))
+
+# Доля итераций задач, для которых снимается профиль фаз (0 - профилирование выключено)
+TASK_PROFILE_SAMPLE_RATE = float(os.getenv("TASK_PROFILE_SAMPLE_RATE", 0.01))
+
+# AsyncBaseTaskRunner: максимум одновременных итераций и таймаут HTTP
+ASYNC_TASK_RUNNER_CONCURRENCY = int(os.getenv("ASYNC_TASK_RUNNER_CONCURRENCY", 100))
+ASYNC_TASK_RUNNER_HTTP_TIMEOUT = float(os.getenv("ASYNC_TASK_RUNNER_HTTP_TIMEOUT", 30))
+
+# Отложенная запись Archive: размер пачки, интервал сброса (сек) и предел очереди
+ARCHIVE_WRITER_BATCH_SIZE = int(os.getenv("ARCHIVE_WRITER_BATCH_SIZE", 200))
+ARCHIVE_WRITER_FLUSH_INTERVAL = float(os.getenv("ARCHIVE_WRITER_FLUSH_INTERVAL", 1.0))
+ARCHIVE_WRITER_MAX_QUEUE = int(os.getenv("ARCHIVE_WRITER_MAX_QUEUE", 10000))
+
+# Сколько изменений InvalidTarget / AccountNotification копить до пакетной записи
+TASK_BOOKKEEPING_FLUSH_SIZE = int(os.getenv("TASK_BOOKKEEPING_FLUSH_SIZE", 500))
+
+# Время жизни (сек) кэшей справочных данных задач в памяти процесса (websocket.services.memo)
+MEMO_DEFAULT_TTL = float(os.getenv("MEMO_DEFAULT_TTL", 300))
+# Сколько секунд в Redis хранится статистика кэшей процесса (после последней задачи)
+MEMO_STATS_TTL = int(os.getenv("MEMO_STATS_TTL", 60 * 60))
+# Модели (app_label.Model через запятую), изменение которых сбрасывает кэш типов
+# ошибок, для которых не сохраняется InvalidTarget
+INVALID_TARGET_SKIPPED_TYPES_MODELS = [
+    label for label in os.getenv("INVALID_TARGET_SKIPPED_TYPES_MODELS", "").split(",") if label
+]
+
+# Контрольные точки задач: как часто сохранять (сек) и сколько хранить незавершённые
+TASK_CHECKPOINT_INTERVAL = float(os.getenv("TASK_CHECKPOINT_INTERVAL", 5))
+TASK_CHECKPOINT_TTL = int(os.getenv("TASK_CHECKPOINT_TTL", 60 * 60 * 24 * 3))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Пул соединений psycopg 3 в каждом процессе (воркеры Celery, ASGI) вместо постоянных
+# соединений: соединения проверяются перед выдачей, простаивающие дольше MAX_IDLE
+# и живущие дольше MAX_LIFETIME закрываются. MAX_SIZE - предел соединений на процесс
+DB_POOL_ENABLED = str_to_bool(os.getenv("DB_POOL_ENABLED", default=False))
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20))
+DB_POOL_MAX_IDLE = int(os.getenv("DB_POOL_MAX_IDLE", 300))
+DB_POOL_MAX_LIFETIME = int(os.getenv("DB_POOL_MAX_LIFETIME", 1800))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 10))
+
 DATABASES = {
     "default": dj_database_url.config(
         default=os.getenv("DATABASE_URL", default=None),
-        conn_max_age=600,  # время жизни соединения (в секундах)
+        # Пул несовместим с постоянными соединениями Django
+        conn_max_age=0 if DB_POOL_ENABLED else 600,  # время жизни соединения (в секундах)
+        conn_health_checks=not DB_POOL_ENABLED,  # проверка соединения перед переиспользованием
         ssl_require=False,
     )
 }
+if DB_POOL_ENABLED and DATABASES["default"]:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "max_idle": DB_POOL_MAX_IDLE,
+        "max_lifetime": DB_POOL_MAX_LIFETIME,
+        "timeout": DB_POOL_TIMEOUT,
+        "check": ConnectionPool.check_connection,
+    }
 if 'test' in sys.argv:
     DATABASES = {
         'default': {
@@ -241,7 +344,16 @@ CELERY_BROKER_URL = os.getenv("REDIS_URL", default="redis://localhost:6379/0")
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 
-CELERY_RESULT_BACKEND = "django-db"
+# Результаты задач: актуальное состояние в Redis, история в БД (django_celery_results),
+# куда их переносит archive_task_results (app/services/result_backend.py)
+CELERY_RESULT_BACKEND = "app.services.result_backend.HybridResultBackend+" + os.getenv(
+    "REDIS_URL", default="redis://localhost:6379/0"
+)
+CELERY_RESULT_REDIS_TTL = int(os.getenv("CELERY_RESULT_REDIS_TTL", 60 * 60 * 24))  # Сколько секунд результат хранится в Redis
+CELERY_RESULT_ARCHIVE_INTERVAL = int(os.getenv("CELERY_RESULT_ARCHIVE_INTERVAL", 60))  # Период переноса в БД (секунд)
+CELERY_RESULT_ARCHIVE_BATCH_SIZE = int(os.getenv("CELERY_RESULT_ARCHIVE_BATCH_SIZE", 500))  # Результатов на один bulk_create
+CELERY_RESULT_ARCHIVE_LOCK_TIMEOUT = 300  # Защита от одновременного переноса (секунд)
+
 CELERY_CACHE_BACKEND = "django-cache"
 CELERY_RESULT_EXTENDED = True
 CELERY_TASK_TRACK_STARTED = True  # Актуально для более новых версий Celery
@@ -259,8 +371,55 @@ CELERYD_MAX_TASKS_PER_CHILD = 60
 # Отвечает за период запуска задачи celery.backend_cleanup
 CELERY_RESULT_EXPIRES = timedelta(days=30)  # Результаты будут храниться 30 дней
 
+# Периодические задачи (django_celery_beat переносит их в свою таблицу при старте beat)
+CELERY_BEAT_SCHEDULE = {
+    "archive-task-results": {
+        "task": "websocket.tasks.archive_task_results",
+        "schedule": CELERY_RESULT_ARCHIVE_INTERVAL,
+    },
+}
+
 DJANGO_CELERY_RESULTS_TASK_ID_MAX_LENGTH=191
 
+# Очереди по классу задержки, у каждой свой пул воркеров (Procfile):
+# realtime - уведомления, default - короткие задачи, bulk - долгие BaseTaskRunner
+CELERY_REALTIME_QUEUE = "realtime"
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_BULK_QUEUE = "bulk"
+
+# Приоритет сообщений в Redis: 0 - самый высокий, 9 - самый низкий
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    # Воркер с несколькими очередями (-Q realtime,default,bulk) сначала
+    # разбирает первую из них
+    "queue_order_strategy": "priority",
+    # Неподтверждённое сообщение (acks_late у задач с контрольными точками) Redis
+    # отдаёт другому воркеру через visibility_timeout секунд: он должен быть
+    # больше времени выполнения самой долгой задачи
+    "visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT", 60 * 60 * 12)),
+}
+
+CELERY_TASK_ROUTES = {
+    "websocket.consumers.send_notification_to_user": {"queue": CELERY_REALTIME_QUEUE, "priority": 0},
+    "websocket.consumers.send_broadcast_notification": {"queue": CELERY_REALTIME_QUEUE, "priority": 1},
+    "notification.tasks.broadcast_telegram_notification": {"queue": CELERY_REALTIME_QUEUE, "priority": 1},
+    "websocket.tasks.finish_chunked_task": {"queue": CELERY_TASK_DEFAULT_QUEUE, "priority": 3},
+    "websocket.tasks.terminate_cancelled_task": {"queue": CELERY_TASK_DEFAULT_QUEUE, "priority": 3},
+    "authenticate.tasks.send_welcome_email_task": {"queue": CELERY_TASK_DEFAULT_QUEUE},
+    "notification.tasks.cleanup_old_notifications": {"queue": CELERY_TASK_DEFAULT_QUEUE, "priority": 7},
+    "celery.backend_cleanup": {"queue": CELERY_TASK_DEFAULT_QUEUE, "priority": 9},
+    "websocket.tasks.archive_task_results": {"queue": CELERY_TASK_DEFAULT_QUEUE, "priority": 9},
+    # Задачи BaseTaskRunner уходят в CELERY_BULK_QUEUE через атрибут queue класса
+}
+
+# Телеметрия задач Celery в Redis (app/services/celery_telemetry.py) и сколько минут её хранить
+CELERY_TELEMETRY_ENABLED = str_to_bool(os.getenv("CELERY_TELEMETRY_ENABLED", "True"))
+CELERY_TELEMETRY_RETENTION = int(os.getenv("CELERY_TELEMETRY_RETENTION", 120))
+
+
+REDIS_URL = os.getenv("REDIS_URL", default="redis://localhost:6379/0")
 
 REDIS_OPTIONS = {
     "socket_connect_timeout": 10,  # Тайм-аут подключения
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.db import models
 from django.utils.html import format_html
-from .models import Notification
+from .models import Notification, BroadcastMessage
 import logging
 
 logger = logging.getLogger(__name__)
@@ -215,3 +216,45 @@ class NotificationAdmin(admin.ModelAdmin):
 
     class Media:
         css = {"all": ("admin/css/custom.css",)}
+
+
+@admin.register(BroadcastMessage)
+class BroadcastMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "message_preview",
+        "message_type",
+        "receipts_count",
+        "created_at",
+    )
+    list_filter = ("message_type", "created_at")
+    search_fields = ("message",)
+    readonly_fields = ("created_at",)
+    date_hierarchy = "created_at"
+    list_per_page = 50
+
+    def message_preview(self, obj):
+        """Сокращенный предпросмотр сообщения"""
+        if len(obj.message) > 50:
+            return obj.message[:50] + "..."
+        return obj.message
+
+    message_preview.short_description = "Сообщение"
+
+    def receipts_count(self, obj):
+        """Количество пользователей, подтвердивших доставку"""
+        return obj.receipts_count
+
+    receipts_count.short_description = "Доставлено"
+    receipts_count.admin_order_field = "receipts_count"
+
+    def has_add_permission(self, request):
+        """Запрет на создание уведомлений через админку"""
+        return False
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(receipts_count=models.Count("receipts"))
+        )
@@ -16,6 +16,41 @@ class Notification(models.Model):
         ]
 
 
+class BroadcastMessage(models.Model):
+    """
+    Системное уведомление для всех пользователей.
+    Хранится одной записью, доставка отмечается в BroadcastReceipt.
+    """
+
+    message = models.TextField()
+    message_type = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"BroadcastMessage({self.id})"
+
+
+class BroadcastReceipt(models.Model):
+    """
+    Отметка о доставке broadcast-уведомления пользователю.
+    Запись создаётся только после подтверждения (acknowledgement) от клиента.
+    """
+
+    broadcast = models.ForeignKey(
+        BroadcastMessage, on_delete=models.CASCADE, related_name="receipts"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    delivered_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "broadcast")
+
+
 class TelegramSubscriber(models.Model):
     chat_id = models.CharField(max_length=64, unique=True)
     is_active = models.BooleanField(default=True)
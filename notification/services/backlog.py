@@ -0,0 +1,165 @@
+import heapq
+from datetime import datetime
+from itertools import islice
+from typing import Iterable
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils.dateparse import parse_datetime
+
+from app import settings
+from authenticate.models import User
+from notification.models import Notification, BroadcastMessage, BroadcastReceipt
+
+
+def get_undelivered_page(
+    user: User, cursor: str | None = None, limit: int | None = None
+) -> tuple[list[dict], str | None, bool]:
+    """
+    Возвращает страницу недоставленных уведомлений пользователя: персональных
+    и broadcast (созданных после регистрации и ещё не подтверждённых).
+
+    Страница содержит не больше limit самых новых уведомлений до cursor,
+    упорядоченных по (created_at, is_broadcast, id): уведомления с одинаковым
+    временем создания не теряются на границе страниц. Из каждой таблицы
+    читается не больше limit + 1 строк, поэтому стоимость запроса не зависит
+    от размера бэклога.
+
+    Возвращает (уведомления, курсор следующей страницы, есть ли ещё).
+    """
+    limit = limit or settings.NOTIFICATION_BACKLOG_PAGE_SIZE
+
+    personal = Notification.objects.filter(user=user, delivered=False)
+    broadcasts = undelivered_broadcasts(user)
+    if position := _parse_cursor(cursor):
+        personal = personal.filter(_before(position, is_broadcast=False))
+        broadcasts = broadcasts.filter(_before(position, is_broadcast=True))
+
+    rows = heapq.merge(
+        _serialize(personal, id_field="notification_id", limit=limit),
+        _serialize(broadcasts, id_field="broadcast_id", limit=limit),
+        key=_position,
+        reverse=True,
+    )
+    page = list(islice(rows, limit + 1))
+    has_more = len(page) > limit
+    page = page[:limit]
+    page.reverse()
+
+    next_cursor = _cursor(_position(page[0])) if page else None
+    for row in page:
+        row["created_at"] = row["created_at"].isoformat()
+    return page, next_cursor, has_more
+
+
+def _serialize(queryset, id_field: str, limit: int) -> list[dict]:
+    # id персональных и broadcast-уведомлений из разных таблиц
+    # и передаются в разных полях (notification_id / broadcast_id)
+    return [
+        {
+            "message": row["message"],
+            "m_type": row["message_type"],
+            "notification_id": None,
+            "broadcast_id": None,
+            id_field: row["id"],
+            "is_broadcast": id_field == "broadcast_id",
+            "created_at": row["created_at"],
+        }
+        for row in queryset.order_by("-created_at", "-id").values(
+            "id", "message", "message_type", "created_at"
+        )[: limit + 1]
+    ]
+
+
+def _position(row: dict) -> tuple[datetime, bool, int]:
+    # Место уведомления в общем порядке двух таблиц
+    return row["created_at"], row["is_broadcast"], row["notification_id"] or row["broadcast_id"]
+
+
+def _cursor(position: tuple[datetime, bool, int]) -> str:
+    created_at, is_broadcast, row_id = position
+    return f"{created_at.isoformat()}|{'b' if is_broadcast else 'n'}|{row_id}"
+
+
+def _parse_cursor(cursor: str | None) -> tuple[datetime, bool | None, int | None] | None:
+    """
+    Разбирает курсор страницы бэклога. Курсор старого формата
+    (только created_at) тоже принимается.
+    """
+    if not cursor:
+        return None
+    created_at, _, rest = cursor.partition("|")
+    created_at = parse_datetime(created_at)
+    if created_at is None:
+        return None
+    if not rest:
+        return created_at, None, None
+    kind, _, row_id = rest.partition("|")
+    return created_at, kind == "b", int(row_id)
+
+
+def _before(position: tuple, is_broadcast: bool) -> Q:
+    """Строки таблицы, которые в общем порядке идут до position"""
+    created_at, cursor_is_broadcast, cursor_id = position
+    if cursor_id is None:
+        return Q(created_at__lt=created_at)
+    if is_broadcast == cursor_is_broadcast:
+        # (created_at, id) < (created_at курсора, id курсора)
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=cursor_id)
+    # При равном created_at персональные идут раньше broadcast
+    if is_broadcast:
+        return Q(created_at__lt=created_at)
+    return Q(created_at__lte=created_at)
+
+
+def undelivered_broadcasts(user: User):
+    return BroadcastMessage.objects.filter(
+        created_at__gte=user.date_joined
+    ).exclude(
+        Exists(
+            BroadcastReceipt.objects.filter(broadcast=OuterRef("pk"), user=user)
+        )
+    )
+
+
+def mark_as_delivered(
+    user: User, notification_ids: Iterable[int] = (), up_to_id: int | None = None
+) -> int:
+    """
+    Отмечает доставленными персональные уведомления пользователя
+    из notification_ids и все с id не больше up_to_id одним UPDATE.
+    """
+    query = _ids_query(notification_ids, up_to_id)
+    if query is None:
+        return 0
+    # Важно проверять, что уведомление принадлежит пользователю
+    return Notification.objects.filter(query, user=user, delivered=False).update(
+        delivered=True
+    )
+
+
+def mark_broadcasts_as_delivered(
+    user: User, broadcast_ids: Iterable[int] = (), up_to_id: int | None = None
+) -> int:
+    """
+    Создаёт отметки о доставке broadcast-уведомлений из broadcast_ids
+    и всех с id не больше up_to_id, которые пользователь ещё не подтвердил.
+    """
+    query = _ids_query(broadcast_ids, up_to_id)
+    if query is None:
+        return 0
+    ids = undelivered_broadcasts(user).filter(query).values_list("id", flat=True)
+    receipts = BroadcastReceipt.objects.bulk_create(
+        [BroadcastReceipt(user=user, broadcast_id=broadcast_id) for broadcast_id in ids],
+        ignore_conflicts=True,
+    )
+    return len(receipts)
+
+
+def _ids_query(ids: Iterable[int], up_to_id: int | None) -> Q | None:
+    ids = list(ids)
+    if not ids and up_to_id is None:
+        return None
+    query = Q(id__in=ids)
+    if up_to_id is not None:
+        query |= Q(id__lte=up_to_id)
+    return query
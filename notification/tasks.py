@@ -4,11 +4,18 @@ from datetime import timedelta
 from typing import Iterable
 
 from aiogram.client.default import DefaultBotProperties
+from django.db.models import Exists, OuterRef, Q
 from django.utils.timezone import now
 from celery import shared_task
 
 from app import settings
-from notification.models import Notification, TelegramSubscriber
+from authenticate.models import User
+from notification.models import (
+    BroadcastMessage,
+    BroadcastReceipt,
+    Notification,
+    TelegramSubscriber,
+)
 from websocket.consumers import send_broadcast_notification
 
 from aiogram import Bot
@@ -25,6 +32,25 @@ def cleanup_old_notifications():
         delivered=True, created_at__lt=cleanup_date
     ).delete()
 
+    # Broadcast-сообщения удаляются, когда их подтвердили все получатели
+    # (как доставленные персональные) или истёк NOTIFICATION_BROADCAST_TTL_DAYS.
+    # Отметки о доставке удаляются каскадно и в счётчик не входят
+    expire_date = now() - timedelta(days=settings.NOTIFICATION_BROADCAST_TTL_DAYS)
+    pending_recipients = User.objects.filter(
+        is_active=True, date_joined__lte=OuterRef("created_at")
+    ).exclude(
+        Exists(
+            BroadcastReceipt.objects.filter(
+                broadcast=OuterRef(OuterRef("pk")), user=OuterRef("pk")
+            )
+        )
+    )
+    _, deleted = BroadcastMessage.objects.filter(
+        Q(created_at__lt=expire_date) | ~Exists(pending_recipients),
+        created_at__lt=cleanup_date,
+    ).delete()
+    deleted_count += deleted.get("notification.BroadcastMessage", 0)
+
     # Отправка уведомления через WebSocket
     if deleted_count:
         send_broadcast_notification.delay(message=f"{deleted_count} старых уведомлений удалено.")
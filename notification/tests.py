@@ -1,3 +1,55 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from authenticate.models import User
+from notification.models import BroadcastMessage, Notification
+from notification.services import backlog
+
+
+class UndeliveredPageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="backlog", password="x")
+        User.objects.filter(id=self.user.id).update(
+            date_joined=timezone.now() - timedelta(days=1)
+        )
+        self.user.refresh_from_db()
+
+    def _read_all(self, limit):
+        messages, cursor = [], None
+        while True:
+            page, cursor, has_more = backlog.get_undelivered_page(self.user, cursor, limit)
+            messages += [row["message"] for row in page]
+            if not has_more:
+                return messages
+
+    def test_pages_do_not_skip_or_repeat_rows_with_equal_created_at(self):
+        created_at = timezone.now()
+        for i in range(5):
+            Notification.objects.create(user=self.user, message=f"p{i}", message_type="info")
+        for i in range(3):
+            BroadcastMessage.objects.create(message=f"b{i}", message_type="info")
+        # Все уведомления созданы в один момент, кроме одного более старого
+        Notification.objects.update(created_at=created_at)
+        BroadcastMessage.objects.update(created_at=created_at)
+        Notification.objects.filter(message="p0").update(
+            created_at=created_at - timedelta(seconds=1)
+        )
+
+        for limit in (1, 2, 3):
+            with self.subTest(limit=limit):
+                messages = self._read_all(limit)
+                self.assertEqual(len(messages), 8)
+                self.assertEqual(
+                    set(messages), {f"p{i}" for i in range(5)} | {f"b{i}" for i in range(3)}
+                )
 
-# Create your tests here.
+    def test_legacy_created_at_cursor_is_accepted(self):
+        notification = Notification.objects.create(
+            user=self.user, message="old", message_type="info"
+        )
+        cursor = (notification.created_at + timedelta(seconds=1)).isoformat()
+        page, _, has_more = backlog.get_undelivered_page(self.user, cursor, 10)
+        self.assertEqual([row["message"] for row in page], ["old"])
+        self.assertFalse(has_more)
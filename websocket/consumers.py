@@ -1,14 +1,10 @@
-import asyncio
 from urllib.parse import parse_qs
 
-from asgiref.sync import async_to_sync
 from celery import shared_task
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 import json
 
-from channels.layers import get_channel_layer
-
 # from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from rest_framework_simplejwt.backends import TokenBackend
@@ -16,127 +12,241 @@ from rest_framework_simplejwt.backends import TokenBackend
 from app import settings
 from authenticate.models import User
 from notification.models import Notification
+from notification.services import backlog
+from websocket.services.acks import AcknowledgementBuffer
+from websocket.services.async_bridge import group_send
+from websocket.services.fanout import NotificationFanout
+from websocket.services.frames import (
+    MSGPACK_SUBPROTOCOL,
+    decode_binary,
+    encode,
+    encode_binary,
+    frame_event,
+    frame_to_binary,
+    legacy_notification_payload,
+    notification_payload,
+    task_payload,
+)
+from websocket.services.heartbeat import heartbeat
+from websocket.services.snapshots import aget_snapshot_event
 import logging
 
 logger = logging.getLogger(__name__)
 
+BROADCAST_GROUP = "notifications"  # Общая группа для всех пользователей
+TASK_CHANNEL_PREFIX = "task:"  # См. frames.task_payload
 
-class ProcessConsumer(AsyncWebsocketConsumer):
-    def __init__(self, *args, **kwargs):
-        super().__init__(args, kwargs)
-        self.group_name = None
 
-    async def connect(self):
-        # Получаем имя группы задачи (по её ID)
-        self.group_name = f'group_{self.scope["url_route"]["kwargs"]["task_id"]}'
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+class StreamConsumer(AsyncWebsocketConsumer):
+    """
+    Единое WebSocket-соединение пользователя (ws/stream/).
 
-    async def disconnect(self, close_code):
-        # Отключить WebSocket из группы
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+    Подключает личную группу пользователя и общую broadcast-группу,
+    позволяет подписываться на прогресс задач через то же соединение:
+        {"type": "subscribe", "channel": "task:<task_id>"}
+        {"type": "unsubscribe", "channel": "task:<task_id>"}
 
-    async def task_canceled(self, event):
-        # Обрабатываем сообщение о том, что задача была отменена
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "status": "canceled",
-                    "message": event.get("message", ""),
-                    "message_error": event.get("message_error", ""),
-                    "progress": event["progress"],
-                    "iteration": event["iteration"],
-                    "success_iteration": event["success_iteration"],
-                    "error_iteration": event["error_iteration"],
-                    "data": event.get("data", {}),
-                }
-            )
-        )
+    Каждое исходящее сообщение помечается полем "channel":
+    "notifications", "broadcast" или "task:<task_id>".
 
-    async def process_update(self, event):
-        # Отправка данных клиенту
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "message": event.get("message", ""),
-                    "message_error": event.get("message_error", ""),
-                    "progress": event["progress"],
-                    "iteration": event["iteration"],
-                    "success_iteration": event["success_iteration"],
-                    "error_iteration": event["error_iteration"],
-                    "data": event.get("data", {}),
-                }
-            )
-        )
+    События channel layer приходят с уже сериализованным кадром (см.
+    websocket.services.frames) и пересылаются клиенту без изменений.
+    Клиент, запросивший подпротокол "msgpack", получает бинарные кадры.
+
+    Старые маршруты (ProcessConsumer, NotificationUserConsumer,
+    BroadcastNotificationConsumer) - это подклассы с урезанным набором
+    возможностей. Кадры, собранные самим консьюмером, идут без поля
+    "channel"; пересылаемые кадры отправителя содержат его всегда.
+    """
 
+    require_auth = True
+    join_user_group = True
+    join_broadcast_group = True
+    send_backlog = True
+    allow_subscriptions = True
+    tag_channels = True
+    # Broadcast с notification_id = -broadcast_id для клиентов, которые
+    # знают только notification_id (см. legacy_notification_payload)
+    legacy_notification_ids = False
+    max_subscriptions = 20
 
-class NotificationUserConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.user = None
         self.room_name = None
-        self.keep_alive_task = None
+        self.acknowledgements = None
+        self.joined_groups = set()
+        self.binary = False
 
     async def connect(self):
-        self.user = await self.get_user_from_token()
-        if self.user is None or isinstance(self.user, AnonymousUser):
-            await self.close()
-            return
+        if self.require_auth:
+            self.user = await self.get_user_from_token()
+            if self.user is None or isinstance(self.user, AnonymousUser):
+                await self.close()
+                return
+            self.acknowledgements = AcknowledgementBuffer(self.user)
+
+        if self.join_user_group:
+            self.room_name = f"user_{self.user.id}"
+            await self.join_group(self.room_name)
+        if self.join_broadcast_group:
+            await self.join_group(BROADCAST_GROUP)
+
+        await self.accept_negotiated()
+        heartbeat.register(self)
+
+        # Отправляем последнюю страницу непрочитанных уведомлений
+        # (персональные и broadcast) только после установки соединения.
+        # Более старые страницы клиент запрашивает сам через get_notifications
+        if self.send_backlog:
+            await self.send_notifications_batch()
 
-        self.room_name = f"user_{self.user.id}"
-        await self.channel_layer.group_add(self.room_name, self.channel_name)
-        await self.accept()
-        self.keep_alive_task = asyncio.create_task(self.ping_loop())
-
-        # Отправляем непрочитанные уведомления только после установки соединения
-        undelivered = await self.get_undelivered_notifications()
-        for notification in undelivered:
-            await self.send_notification(
-                {
-                    "message": notification.message,
-                    "m_type": notification.message_type,
-                    "notification_id": notification.id,
-                }
-            )
+    async def disconnect(self, close_code):
+        for group in list(self.joined_groups):
+            await self.leave_group(group)
+        heartbeat.unregister(self)
+        if self.acknowledgements:
+            # Сбрасываем в БД подтверждения, накопленные до отключения
+            await self.acknowledgements.close()
+
+    async def accept_negotiated(self):
+        # msgpack-кадры включаются только если клиент сам их запросил
+        if MSGPACK_SUBPROTOCOL in self.scope.get("subprotocols", []):
+            self.binary = True
+            await self.accept(subprotocol=MSGPACK_SUBPROTOCOL)
+        else:
+            await self.accept()
 
-    @database_sync_to_async
-    def get_undelivered_notifications(self):
-        return list(
-            Notification.objects.filter(user=self.user, delivered=False).order_by(
-                "created_at"
-            )
-        )
+    async def join_group(self, group):
+        await self.channel_layer.group_add(group, self.channel_name)
+        self.joined_groups.add(group)
 
-    async def disconnect(self, close_code):
-        if self.user:
-            await self.channel_layer.group_discard(self.room_name, self.channel_name)
-        if self.keep_alive_task:
-            self.keep_alive_task.cancel()
+    async def leave_group(self, group):
+        await self.channel_layer.group_discard(group, self.channel_name)
+        self.joined_groups.discard(group)
 
     async def receive(self, text_data=None, bytes_data=None):
         """Обработка входящих сообщений"""
+        heartbeat.alive(self)
         try:
-            content = json.loads(text_data)
+            if bytes_data is not None:
+                content = decode_binary(bytes_data)
+            else:
+                content = json.loads(text_data)
             await self.receive_json(content)
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON received: {e}")
+        except ValueError as e:
+            logger.error(f"Invalid message received: {e}")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
 
     async def receive_json(self, content):
         """Обработка декодированного JSON"""
-        if content.get("type") == "acknowledgement":
-            notification_id = content.get("notification_id")
-            if notification_id:
-                await self.mark_as_delivered(notification_id)
+        message_type = content.get("type")
+        if message_type == "pong":
+            heartbeat.pong(self)
+        elif message_type == "acknowledgement" and self.acknowledgements:
+            await self.acknowledgements.add(content)
+        elif message_type == "get_notifications" and self.send_backlog:
+            # Клиент запрашивает следующую (более старую) страницу бэклога
+            await self.send_notifications_batch(content.get("cursor"))
+        elif message_type in ("subscribe", "unsubscribe") and self.allow_subscriptions:
+            await self.change_subscription(message_type, content.get("channel"))
+
+    async def change_subscription(self, action, channel):
+        if not isinstance(channel, str) or not channel.startswith(TASK_CHANNEL_PREFIX):
+            return
+        task_id = channel.removeprefix(TASK_CHANNEL_PREFIX)
+        group = f"group_{task_id}"
+
+        if action == "subscribe":
+            task_groups = [g for g in self.joined_groups if g.startswith("group_")]
+            if group not in self.joined_groups and len(task_groups) >= self.max_subscriptions:
+                await self.send_frame(
+                    {"type": "error", "message": "Too many subscriptions", "channel": channel}
+                )
+                return
+            await self.join_group(group)
+            await self.send_frame({"type": "subscribed", "channel": channel})
+            await self.send_task_snapshot(task_id)
+        else:
+            await self.leave_group(group)
+            await self.send_frame({"type": "unsubscribed", "channel": channel})
+
+    async def send_task_snapshot(self, task_id):
+        # Последнее состояние задачи для клиента, подключившегося посреди
+        # выполнения или уже после её завершения
+        event = await aget_snapshot_event(task_id)
+        if event:
+            await self.forward(event, task_payload)
+
+    async def send_frame(self, payload):
+        """Кодирование и отправка кадра, собранного самим консьюмером"""
+        if not self.tag_channels:
+            payload = {k: v for k, v in payload.items() if k != "channel"}
+        if self.binary:
+            await self.send(bytes_data=encode_binary(payload))
+        else:
+            await self.send(text_data=encode(payload))
+
+    async def forward(self, event, build_payload):
+        """
+        Пересылка кадра, сериализованного отправителем.
+        События без кадра (от старых воркеров) собираются на месте.
+        """
+        frame = event.get("frame")
+        if frame is None:
+            await self.send_frame(build_payload(event))
+        elif self.binary:
+            await self.send(bytes_data=event.get("frame_bin") or frame_to_binary(frame))
+        else:
+            await self.send(text_data=frame)
+
+    async def send_notifications_batch(self, cursor=None):
+        notifications, next_cursor, has_more = await self.get_undelivered_page(cursor)
+        if not notifications and cursor is None:
+            return
+        if self.legacy_notification_ids:
+            notifications = [legacy_notification_payload(n) for n in notifications]
+        await self.send_frame(
+            {
+                "type": "notifications_batch",
+                "notifications": notifications,
+                "cursor": next_cursor,
+                "has_more": has_more,
+                "channel": "notifications",
+            }
+        )
+
+    @database_sync_to_async
+    def get_undelivered_page(self, cursor):
+        return backlog.get_undelivered_page(self.user, cursor)
 
     async def send_notification(self, event):
-        notification = {
-            "message": event.get("message"),
-            "m_type": event.get("m_type", "default_value"),
-            "notification_id": event.get("notification_id", None),
-        }
-        await self.send(text_data=json.dumps(notification))
+        def build_payload(e):
+            return notification_payload(
+                e.get("message"),
+                e.get("m_type", "default_value"),
+                e.get("notification_id", None),
+                e.get("broadcast_id", None),
+            )
+
+        if self.legacy_notification_ids:
+            # Кадр отправителя перекодируется только на старых маршрутах
+            payload = json.loads(event["frame"]) if event.get("frame") else build_payload(event)
+            event = {"frame": encode(legacy_notification_payload(payload))}
+        await self.forward(event, build_payload)
+
+    async def task_canceled(self, event):
+        # Обрабатываем сообщение о том, что задача была отменена
+        await self.forward(event, task_payload)
+
+    async def process_update(self, event):
+        # Отправка данных клиенту
+        await self.forward(event, task_payload)
+
+    async def process_finished(self, event):
+        # Финальный статус задачи
+        await self.forward(event, task_payload)
 
     @database_sync_to_async
     def get_user_from_token(self):
@@ -158,122 +268,49 @@ class NotificationUserConsumer(AsyncWebsocketConsumer):
             logger.error(f"Invalid token: {e}")
             return AnonymousUser()
 
-    @database_sync_to_async
-    def mark_as_delivered(self, notification_id):
-        try:
-            Notification.objects.filter(
-                id=notification_id,
-                user=self.user,  # Важно проверять, что уведомление принадлежит пользователю
-            ).update(delivered=True)
-            return True
-        except Exception as e:
-            logger.error(f"Error marking notification as delivered: {e}")
-            return False
 
-    async def ping_loop(self):
-        try:
-            while True:
-                await asyncio.sleep(30)  # каждые 30 секунд
-                await self.send(text_data=json.dumps({"type": "ping"}))
-        except asyncio.CancelledError:
-            pass
+class ProcessConsumer(StreamConsumer):
+    """
+    Совместимость: прогресс одной задачи (ws/process_status/<task_id>/),
+    без авторизации и без поля "channel" в сообщениях.
+    """
 
-
-class BroadcastNotificationConsumer(AsyncWebsocketConsumer):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.user = None
-        self.broadcast_group = "notifications"  # Общая группа для всех пользователей
-        self.keep_alive_task = None
+    require_auth = False
+    join_user_group = False
+    join_broadcast_group = False
+    send_backlog = False
+    allow_subscriptions = False
+    tag_channels = False
 
     async def connect(self):
-        # Проверяем авторизацию пользователя
-        self.user = await self.get_user_from_token()
-        if self.user is None or isinstance(self.user, AnonymousUser):
-            await self.close()
-        else:
-            # Добавляем пользователя в общую группу для broadcast-сообщений
-            await self.channel_layer.group_add(self.broadcast_group, self.channel_name)
-            await self.accept()
-            self.keep_alive_task = asyncio.create_task(self.ping_loop())
+        # Получаем имя группы задачи (по её ID)
+        task_id = self.scope["url_route"]["kwargs"]["task_id"]
+        await self.join_group(f"group_{task_id}")
+        await self.accept_negotiated()
+        await self.send_task_snapshot(task_id)
 
-    async def disconnect(self, close_code):
-        if self.user:
-            await self.channel_layer.group_discard(
-                self.broadcast_group, self.channel_name
-            )
-        if self.keep_alive_task:
-            self.keep_alive_task.cancel()
 
-    async def receive(self, text_data=None, bytes_data=None):
-        """Обработка входящих сообщений"""
-        try:
-            content = json.loads(text_data)
-            await self.receive_json(content)
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON received: {e}")
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
+class NotificationUserConsumer(StreamConsumer):
+    """
+    Совместимость: личные уведомления пользователя (ws/notifications/user/).
+    """
 
-    async def receive_json(self, content):
-        """Обработка декодированного JSON"""
-        if content.get("type") == "acknowledgement":
-            notification_id = content.get("notification_id")
-            if notification_id:
-                await self.mark_as_delivered(notification_id)
+    join_broadcast_group = False
+    allow_subscriptions = False
+    tag_channels = False
+    legacy_notification_ids = True
 
-    async def send_notification(self, event):
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "message": event["message"],
-                    "m_type": event["m_type"],
-                    "notification_id": event.get("notification_id"),
-                    "is_broadcast": event.get("is_broadcast", False),
-                }
-            )
-        )
 
-    @database_sync_to_async
-    def get_user_from_token(self):
-        query_string = self.scope.get("query_string", b"").decode()
-        params = parse_qs(query_string)
-        token = params.get("token", [None])[0]
+class BroadcastNotificationConsumer(StreamConsumer):
+    """
+    Совместимость: общие уведомления (ws/notifications/broadcast/).
+    """
 
-        if not token:
-            return AnonymousUser()
-
-        try:
-            token_backend = TokenBackend(
-                algorithm="HS256", signing_key=settings.SECRET_KEY
-            )
-            valid_data = token_backend.decode(token, verify=True)
-            user_id = valid_data["user_id"]
-            # User = get_user_model()
-            return User.objects.get(id=user_id)
-        except Exception as e:
-            logger.error(f"Invalid token: {e}")
-            return AnonymousUser()
-
-    @database_sync_to_async
-    def mark_as_delivered(self, notification_id):
-        try:
-            Notification.objects.filter(
-                id=notification_id,
-                user=self.user,  # Важно проверять, что уведомление принадлежит пользователю
-            ).update(delivered=True)
-            return True
-        except Exception as e:
-            logger.error(f"Error marking notification as delivered: {e}")
-            return False
-
-    async def ping_loop(self):
-        try:
-            while True:
-                await asyncio.sleep(30)  # каждые 30 секунд
-                await self.send(text_data=json.dumps({"type": "ping"}))
-        except asyncio.CancelledError:
-            pass
+    join_user_group = False
+    send_backlog = False
+    allow_subscriptions = False
+    tag_channels = False
+    legacy_notification_ids = True
 
 
 @shared_task
@@ -283,37 +320,17 @@ def send_notification_to_user(user_id, message, m_type="info"):
         user_id=user_id, message=message, message_type=m_type
     )
 
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
+    # Отправка через постоянный event loop процесса воркера
+    group_send(
         f"user_{user_id}",
-        {
-            "type": "send_notification",
-            "message": message,
-            "m_type": m_type,
-            "notification_id": notification.id,
-        },
+        frame_event(
+            "send_notification",
+            notification_payload(message, m_type, notification.id),
+        ),
     )
 
 
 @shared_task
 def send_broadcast_notification(message, m_type="info"):
-    # User = get_user_model()
-    channel_layer = get_channel_layer()
-
-    for user in User.objects.filter(is_active=True):
-        # Создаем уведомление для каждого пользователя
-        notification = Notification.objects.create(
-            user=user, message=message, message_type=m_type
-        )
-
-        # Отправляем персональное уведомление каждому пользователю
-        async_to_sync(channel_layer.group_send)(
-            f"user_{user.id}",  # Отправляем в личную группу пользователя
-            {
-                "type": "send_notification",
-                "message": message,
-                "m_type": m_type,
-                "notification_id": notification.id,
-                "is_broadcast": True,
-            },
-        )
+    # Сообщение сохраняется один раз и рассылается чанками, см. NotificationFanout
+    return NotificationFanout(message, m_type).run()
@@ -0,0 +1,95 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authenticate.models import User
+from websocket.services.fanout import NotificationFanout
+
+
+class _Rollback(Exception):
+    pass
+
+
+class CountingChannelLayer:
+    """Заглушка channel layer: только считает group_send, ничего не отправляет."""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def group_send(self, group, message):
+        self.sent += 1
+
+
+class Command(BaseCommand):
+    """
+    Замер времени и памяти broadcast-рассылки.
+    Все созданные пользователи и сообщения откатываются в конце.
+
+    Примеры использования:
+    python manage.py bench_broadcast_fanout --users 10000 100000
+    python manage.py bench_broadcast_fanout --users 10000 --real-layer
+    """
+
+    help = "Бенчмарк broadcast-рассылки уведомлений"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            nargs="+",
+            default=[10000, 100000],
+            help="Количество пользователей для замера",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Размер чанка (по умолчанию NOTIFICATION_FANOUT_CHUNK_SIZE)",
+        )
+        parser.add_argument(
+            "--real-layer",
+            action="store_true",
+            help="Отправлять в настроенный channel layer вместо заглушки",
+        )
+
+    def handle(self, *args, **options):
+        for users_count in options["users"]:
+            try:
+                with transaction.atomic():
+                    self._bench(users_count, options)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+    def _bench(self, users_count, options):
+        User.objects.bulk_create(
+            [
+                User(username=f"bench_fanout_{i}", email=f"bench_fanout_{i}@example.com")
+                for i in range(users_count)
+            ],
+            batch_size=5000,
+        )
+
+        channel_layer = None if options["real_layer"] else CountingChannelLayer()
+        fanout = NotificationFanout(
+            "Benchmark",
+            chunk_size=options["chunk_size"],
+            channel_layer=channel_layer,
+        )
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        total = fanout.run()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"users={users_count} recipients={total} "
+                f"time={elapsed:.2f}s rate={total / elapsed:.0f}/s "
+                f"peak_memory={peak / 1024 / 1024:.1f}MB"
+            )
+        )
@@ -0,0 +1,47 @@
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand
+
+from websocket.services.async_bridge import group_send
+
+
+class Command(BaseCommand):
+    """
+    Стоимость отправки в channel layer из синхронного кода (задачи Celery):
+    async_to_sync(group_send) на каждый вызов против постоянного event loop
+    процесса (websocket.services.async_bridge).
+
+    Пример использования:
+    python manage.py bench_channel_sends --sends 2000
+    """
+
+    help = "Бенчмарк отправок в channel layer из синхронного кода"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sends", type=int, default=1000)
+        parser.add_argument("--group", default="bench_channel_sends")
+
+    def handle(self, *args, **options):
+        sends, group = options["sends"], options["group"]
+        channel_layer = get_channel_layer()
+        message = {"type": "send_notification", "message": "bench"}
+
+        results = {}
+        for name, send in (
+            ("async_to_sync", async_to_sync(channel_layer.group_send)),
+            ("async bridge", lambda g, m: group_send(g, m, channel_layer=channel_layer)),
+        ):
+            send(group, message)  # прогрев (соединения с Redis)
+            started = time.perf_counter()
+            for _ in range(sends):
+                send(group, message)
+            results[name] = (time.perf_counter() - started) / sends * 1000
+            self.stdout.write(
+                self.style.SUCCESS(f"{name}: {results[name]:.3f}ms per send")
+            )
+
+        before, after = results.values()
+        if after:
+            self.stdout.write(f"Speedup: {before / after:.1f}x")
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+
+from app import settings
+
+
+class Command(BaseCommand):
+    """
+    Накладные расходы на соединение с БД для коротких задач Celery:
+    закрытие всех соединений после каждой задачи (как было раньше)
+    против переиспользования соединения (close_old_connections)
+    в текущем режиме DATABASES (постоянные соединения или пул
+    при DB_POOL_ENABLED).
+
+    Каждая "задача" выполняет --queries запросов SELECT 1. В режиме пула
+    закрытие тоже возвращает соединение в пул, поэтому для сравнения
+    с новым подключением на каждую задачу запускать с DB_POOL_ENABLED=False.
+
+    Пример использования:
+    python manage.py bench_db_connections --tasks 200 --queries 3
+    """
+
+    help = "Бенчмарк соединений с БД между задачами"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=200)
+        parser.add_argument("--queries", type=int, default=3)
+
+    def _task(self, queries: int) -> None:
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+
+    def handle(self, *args, **options):
+        tasks, queries = options["tasks"], options["queries"]
+        mode = "pool" if settings.DB_POOL_ENABLED else "persistent"
+
+        def close_all():
+            for conn in connections.all():
+                conn.close()
+
+        results = {}
+        for name, after_task in (
+            ("close after each task", close_all),
+            (f"reuse ({mode})", close_old_connections),
+        ):
+            close_all()
+            self._task(queries)  # прогрев (создание пула)
+            started = time.perf_counter()
+            for _ in range(tasks):
+                close_old_connections()
+                self._task(queries)
+                after_task()
+            results[name] = (time.perf_counter() - started) / tasks * 1000
+            self.stdout.write(
+                self.style.SUCCESS(f"{name}: {results[name]:.2f}ms per task")
+            )
+
+        before, after = results.values()
+        if before:
+            self.stdout.write(
+                f"Connection overhead removed: {before - after:.2f}ms per task "
+                f"({(before - after) / before:.0%})"
+            )
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from websocket.consumers import StreamConsumer
+from websocket.services.frames import frame_event, task_payload
+
+
+class _BenchConsumer(StreamConsumer):
+    """Консьюмер без сокета: отправленные кадры только считаются"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        self.sent += 1
+
+
+class Command(BaseCommand):
+    """
+    CPU на доставку одного события задачи N получателям:
+    сборка и json.dumps в каждом консьюмере против пересылки кадра,
+    закодированного один раз отправителем.
+
+    Пример использования:
+    python manage.py bench_frames --deliveries 10000
+    """
+
+    help = "Бенчмарк кодирования WebSocket-кадров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--deliveries", type=int, default=10000)
+        parser.add_argument("--msgpack", action="store_true", help="msgpack-клиенты")
+
+    def handle(self, *args, **options):
+        deliveries = options["deliveries"]
+        event = {
+            "type": "process_update",
+            "task_id": "bench",
+            "message": "Обработан аккаунт bench_user",
+            "message_error": "",
+            "progress": 42,
+            "iteration": 420,
+            "success_iteration": 400,
+            "error_iteration": 20,
+            "data": {"username": "bench_user", "id": 123456, "items": list(range(20))},
+        }
+
+        consumer = _BenchConsumer()
+        consumer.binary = options["msgpack"]
+
+        async def legacy():
+            # Как было: каждый консьюмер собирает словарь и кодирует его сам
+            for _ in range(deliveries):
+                await consumer.send(text_data=json.dumps(task_payload(event)))
+
+        async def encoded_once():
+            frame = frame_event("process_update", task_payload(event))
+            for _ in range(deliveries):
+                await consumer.process_update(dict(frame))
+
+        for name, bench in (("per-recipient json", legacy), ("encode once", encoded_once)):
+            started = time.process_time()
+            asyncio.run(bench())
+            elapsed = time.process_time() - started
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{name}: {elapsed * 1000:.1f}ms CPU per {deliveries} deliveries"
+                )
+            )
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.celery import app
+from authenticate.models import User
+from websocket.services.async_task import AsyncBaseTaskRunner
+from websocket.services.task import BaseTaskRunner
+
+
+class _BenchMixin:
+    """Итерация - только ожидание I/O длиной latency секунд"""
+
+    def setup_task(self, *args, **kwargs):
+        self.items = kwargs["items"]
+        self.latency = kwargs["latency"]
+        super().setup_task(*args, **kwargs)
+
+    def run(self, *args, **kwargs):
+        return self.run_task(*args, **kwargs)
+
+    def count_iteration(self):
+        self.incr_success()
+        self.incr_progress()
+        self.incr_iterations()
+
+
+class ThreadBenchRunner(_BenchMixin, BaseTaskRunner):
+    name = "bench.thread_runner"
+
+    def generate_data(self):
+        return ({"n": n} for n in range(self.items))
+
+    def action_runer(self, data):
+        time.sleep(self.latency)
+        self.count_iteration()
+        return True
+
+
+class AsyncBenchRunner(_BenchMixin, AsyncBaseTaskRunner):
+    name = "bench.async_runner"
+
+    async def generate_data(self):
+        return ({"n": n} for n in range(self.items))
+
+    async def action_runer(self, data):
+        await asyncio.sleep(self.latency)
+        self.count_iteration()
+        return True
+
+
+class Command(BaseCommand):
+    """
+    Пропускная способность одного воркера: BaseTaskRunner (пул потоков)
+    против AsyncBaseTaskRunner (корутины) на итерациях, которые только
+    ждут I/O. Оба раннера работают с настройками параллелизма по умолчанию
+    (TASK_CONCURRENCY_* и ASYNC_TASK_RUNNER_CONCURRENCY).
+
+    Задачи выполняются локально (eager) от имени --user-id: пользователь
+    получит уведомления о завершении, а в журнал задач попадут записи.
+
+    Пример использования:
+    python manage.py bench_task_runners --user-id 1 --items 2000 --latency 0.05
+    """
+
+    help = "Бенчмарк BaseTaskRunner против AsyncBaseTaskRunner"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, required=True)
+        parser.add_argument("--items", type=int, default=1000)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            nargs="+",
+            default=[0.01, 0.05, 0.2],
+            help="Длительность ожидания I/O в итерации (секунд)",
+        )
+
+    def handle(self, *args, **options):
+        if not User.objects.filter(id=options["user_id"]).exists():
+            raise CommandError(f"User {options['user_id']} not found")
+
+        runners = [app.register_task(ThreadBenchRunner()), app.register_task(AsyncBenchRunner())]
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        try:
+            for latency in options["latency"]:
+                for runner in runners:
+                    self._bench(runner, latency, options)
+        finally:
+            app.conf.task_always_eager = eager
+
+    def _bench(self, runner, latency, options):
+        started = time.perf_counter()
+        result = runner.apply(
+            kwargs={
+                "user_id": options["user_id"],
+                "items": options["items"],
+                "latency": latency,
+            }
+        ).get()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{type(runner).__name__} latency={latency * 1000:.0f}ms "
+                f"items={result['iteration']} time={elapsed:.2f}s "
+                f"rate={result['iteration'] / elapsed:.0f}/s "
+                f"final_concurrency={result['concurrency']}"
+            )
+        )
@@ -1,11 +1,13 @@
 from django.urls import path, re_path
 from .consumers import (
+    StreamConsumer,
     ProcessConsumer,
     NotificationUserConsumer,
     BroadcastNotificationConsumer,
 )
 
 websocket_urlpatterns = [
+    re_path(r"ws/stream/$", StreamConsumer.as_asgi()),
     path("ws/process_status/<str:task_id>/", ProcessConsumer.as_asgi()),
     re_path(r"ws/notifications/user/$", NotificationUserConsumer.as_asgi()),
     re_path(r"ws/notifications/broadcast/$", BroadcastNotificationConsumer.as_asgi()),
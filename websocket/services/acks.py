@@ -0,0 +1,129 @@
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+
+from app import settings
+from authenticate.models import User
+from notification.services import backlog
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingAcks:
+    def __init__(self) -> None:
+        self.ids: set[int] = set()
+        self.up_to_id: int | None = None
+
+    def add(self, ids: list[int], up_to_id: int | None) -> None:
+        if up_to_id is not None:
+            self.up_to_id = max(self.up_to_id or 0, up_to_id)
+        self.ids.update(ids)
+        # id, покрытые up_to_id, отдельно отправлять не нужно
+        if self.up_to_id is not None:
+            self.ids = {i for i in self.ids if i > self.up_to_id}
+
+    def __len__(self) -> int:
+        return len(self.ids) + (self.up_to_id is not None)
+
+
+class AcknowledgementBuffer:
+    """
+    Буфер подтверждений доставки уведомлений для одного WebSocket-соединения.
+
+    Подтверждения накапливаются в памяти и записываются в БД одним
+    UPDATE (и одним bulk_create для broadcast) по таймеру flush_interval,
+    при переполнении max_size или при отключении клиента.
+
+    Поддерживаемые формы сообщения:
+        {"type": "acknowledgement", "notification_id": 1}
+        {"type": "acknowledgement", "notification_ids": [1, 2, 3]}
+        {"type": "acknowledgement", "up_to_id": 10}
+    Broadcast-уведомления подтверждаются своими полями (id из другой таблицы):
+        {"type": "acknowledgement", "broadcast_id": 1}
+        {"type": "acknowledgement", "broadcast_ids": [1, 2, 3]}
+        {"type": "acknowledgement", "broadcast_up_to_id": 10}
+    Клиенты старых маршрутов получают broadcast с notification_id, равным
+    -broadcast_id, и подтверждают его так же:
+        {"type": "acknowledgement", "notification_id": -1}
+    """
+
+    def __init__(
+        self,
+        user: User,
+        flush_interval: float | None = None,
+        max_size: int | None = None,
+    ) -> None:
+        self.user = user
+        self.flush_interval = flush_interval or settings.NOTIFICATION_ACK_FLUSH_INTERVAL
+        self.max_size = max_size or settings.NOTIFICATION_ACK_MAX_BUFFER
+        self.personal = _PendingAcks()
+        self.broadcast = _PendingAcks()
+        self._flush_task: asyncio.Task | None = None
+
+    @staticmethod
+    def _parse(content: dict, prefix: str, up_to_key: str) -> tuple[list[int], int | None]:
+        ids = content.get(f"{prefix}_ids") or []
+        if content.get(f"{prefix}_id") is not None:
+            ids = [*ids, content[f"{prefix}_id"]]
+        ids = [i for i in ids if isinstance(i, int)]
+        up_to_id = content.get(up_to_key)
+        if not isinstance(up_to_id, int):
+            up_to_id = None
+        return ids, up_to_id
+
+    async def add(self, content: dict) -> None:
+        personal_ids, up_to_id = self._parse(content, "notification", "up_to_id")
+        broadcast_ids, broadcast_up_to_id = self._parse(
+            content, "broadcast", "broadcast_up_to_id"
+        )
+        # Broadcast со старых маршрутов (см. legacy_notification_payload)
+        broadcast_ids += [-i for i in personal_ids if i < 0]
+        personal_ids = [i for i in personal_ids if i > 0]
+
+        added = False
+        for pending, ids, up_to in (
+            (self.personal, personal_ids, up_to_id),
+            (self.broadcast, broadcast_ids, broadcast_up_to_id),
+        ):
+            if ids or up_to is not None:
+                pending.add(ids, up_to)
+                added = True
+        if not added:
+            return
+
+        if len(self.personal) + len(self.broadcast) >= self.max_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        personal, self.personal = self.personal, _PendingAcks()
+        broadcast, self.broadcast = self.broadcast, _PendingAcks()
+        if not personal and not broadcast:
+            return
+        try:
+            await self._write(personal, broadcast)
+        except Exception as e:
+            logger.error(f"Error marking notifications as delivered: {e}")
+
+    async def close(self) -> None:
+        """Отменяет таймер и сбрасывает накопленные подтверждения"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    @database_sync_to_async
+    def _write(self, personal: _PendingAcks, broadcast: _PendingAcks) -> None:
+        if personal:
+            backlog.mark_as_delivered(self.user, personal.ids, personal.up_to_id)
+        if broadcast:
+            backlog.mark_broadcasts_as_delivered(
+                self.user, broadcast.ids, broadcast.up_to_id
+            )
@@ -0,0 +1,107 @@
+import logging
+import queue
+import threading
+
+from django.db import connection
+
+from app import settings
+from archive.models import Archive
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveWriter:
+    """
+    Отложенная запись строк Archive пачками.
+
+    Потоки задачи кладут несохранённые объекты Archive в ограниченную
+    очередь (при переполнении add ждёт, поэтому память ограничена),
+    фоновый поток сохраняет их через bulk_create, когда набирается
+    batch_size записей или раз в interval секунд. Если пачка не
+    сохранилась, записи сохраняются по одной, и теряются только
+    строки, которые не удалось записать и отдельно.
+    """
+
+    def __init__(
+        self,
+        batch_size: int | None = None,
+        interval: float | None = None,
+        max_queue: int | None = None,
+        profiler=None,
+    ):
+        self.batch_size = batch_size or settings.ARCHIVE_WRITER_BATCH_SIZE
+        self.interval = interval or settings.ARCHIVE_WRITER_FLUSH_INTERVAL
+        self._queue: queue.Queue[Archive] = queue.Queue(
+            maxsize=max_queue or settings.ARCHIVE_WRITER_MAX_QUEUE
+        )
+        self._profiler = profiler
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="archive-writer", daemon=True
+        )
+        self._thread.start()
+
+    def add(self, record: Archive) -> None:
+        if self._closed:
+            self._write([record])
+            return
+        self._queue.put(record)
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Сохранить накопленное, не дожидаясь интервала"""
+        self._wakeup.set()
+
+    def close(self, timeout: float = 30) -> None:
+        """Сохраняет всё накопленное и останавливает поток"""
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+        # Записи, добавленные во время остановки потока
+        self._drain()
+
+    def _run(self) -> None:
+        try:
+            while not self._closed:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+                self._drain()
+            self._drain()
+        finally:
+            # Соединение с БД этого потока больше не понадобится
+            connection.close()
+
+    def _drain(self) -> None:
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            if len(batch) < self.batch_size:
+                return
+
+    def _write(self, batch: list[Archive]) -> None:
+        if self._profiler:
+            with self._profiler.phase("archive_write", always=True):
+                self._write_batch(batch)
+        else:
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: list[Archive]) -> None:
+        try:
+            Archive.objects.bulk_create(batch)
+            return
+        except Exception as e:
+            logger.error(f"Failed to create {len(batch)} archive records: {e}")
+
+        for record in batch:
+            try:
+                record.save()
+            except Exception as e:
+                logger.error(f"Failed to create archive record: {e}")
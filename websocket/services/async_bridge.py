@@ -0,0 +1,102 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Coroutine
+
+from channels.layers import get_channel_layer
+
+from app import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBridge:
+    """
+    Один постоянный event loop на процесс в отдельном потоке для вызова
+    асинхронного кода (channel layer) из синхронных задач Celery.
+
+    async_to_sync на каждый вызов поднимает новый event loop, а
+    channels_redis держит пулы соединений с Redis отдельно для каждого
+    loop, поэтому каждая отправка открывала и закрывала соединения.
+    Через мост все отправки процесса идут в одном loop и переиспользуют
+    его пул. После fork воркера Celery loop и поток создаются заново.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._pid = None
+        self._pending: set[concurrent.futures.Future] = set()
+
+    def _ensure_running(self) -> asyncio.AbstractEventLoop:
+        # Loop родителя после fork остаётся без потока, который его крутит
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return self._loop
+            self._pid = os.getpid()
+            self._pending = set()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._loop,), name="async-bridge", daemon=True
+            )
+            self._thread.start()
+            return self._loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Запускает корутину в loop процесса из любого потока"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_running())
+
+    def run(self, coro: Coroutine, timeout: float | None = None) -> Any:
+        """Выполняет корутину и ждёт результат, как async_to_sync"""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("AsyncBridge.run() cannot be called from the bridge loop")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def fire_and_forget(self, coro: Coroutine) -> None:
+        """Запускает корутину без ожидания, ошибки только пишутся в лог"""
+        future = self.submit(coro)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+        if not future.cancelled() and (error := future.exception()):
+            logger.error(f"Async bridge call failed: {error}")
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Ждёт запущенные через fire_and_forget корутины"""
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            concurrent.futures.wait(pending, timeout or settings.CHANNEL_SEND_TIMEOUT)
+
+
+async_bridge = AsyncBridge()
+
+
+def group_send(group: str, message: dict, wait: bool = True, channel_layer=None) -> None:
+    """
+    group_send в channel layer из синхронного кода через async_bridge.
+    wait=False - не ждать отправки (fire-and-forget).
+    """
+    coro = (channel_layer or get_channel_layer()).group_send(group, message)
+    if wait:
+        async_bridge.run(coro, settings.CHANNEL_SEND_TIMEOUT)
+    else:
+        async_bridge.fire_and_forget(coro)
@@ -0,0 +1,234 @@
+import asyncio
+import time
+from typing import AsyncIterator, Iterable
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from app import settings
+from websocket.services.task import BaseTaskRunner, _NO_DATA
+
+
+class AsyncBaseTaskRunner(BaseTaskRunner):
+    """
+    Вариант BaseTaskRunner для задач, упирающихся в I/O: итерации
+    выполняются корутинами в одном event loop вместо пула потоков,
+    число одновременных итераций ведёт тот же контроллер параллелизма
+    (до ASYNC_TASK_RUNNER_CONCURRENCY по умолчанию).
+
+    Хуки те же, что у BaseTaskRunner, но асинхронные: generate_data,
+    verification, action_runer, check_skipped_rules. Для HTTP-запросов
+    есть общий self.http_client (httpx.AsyncClient). Синхронный ORM
+    вызывается через await self.orm(func, ...) - все вызовы идут в один
+    поток задачи.
+
+    Помощники BaseTaskRunner, которые ходят в БД (справочник пропускаемых
+    типов, сброс bookkeeping), вызываются из корутин только в async-версиях:
+    await self.acheck_internal_response(...) и
+    await self.acheck_account_session_error(...).
+    """
+
+    concurrency_max = settings.ASYNC_TASK_RUNNER_CONCURRENCY
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_client: httpx.AsyncClient | None = None
+
+    def run_task(self, *args, **kwargs):
+        """
+        Запуск задачи Celery с асинхронной обработкой итераций.
+        """
+        # Закрытие старых соединений перед стартом задачи
+        close_old_connections()
+
+        self.setup_task(*args, **kwargs)  # Установить параметры задачи
+
+        try:
+            asyncio.run(self._run_async(args, kwargs))
+        except Exception as e:
+            self.logger.error(f"Error during task {self.task_id}: {e}")
+        finally:
+            self._finish_task()
+
+        return self.result
+
+    async def orm(self, func, *args, **kwargs):
+        """Вызов синхронного кода с ORM из корутины"""
+        return await sync_to_async(func, thread_sensitive=True)(*args, **kwargs)
+
+    def max_concurrency(self) -> int:
+        # Итерации не держат своих соединений: ORM идёт в одном потоке задачи
+        return self.concurrency_max or settings.TASK_CONCURRENCY_MAX
+
+    async def acheck_internal_response(self, *args, **kwargs) -> bool:
+        return await self.orm(self._check_internal_response, *args, **kwargs)
+
+    async def acheck_account_session_error(self, *args, **kwargs) -> None:
+        return await self.orm(self.check_account_session_error, *args, **kwargs)
+
+    def _check_internal_response(self, *args, **kwargs) -> bool:
+        _ensure_no_running_loop("acheck_internal_response")
+        return super()._check_internal_response(*args, **kwargs)
+
+    def check_account_session_error(self, *args, **kwargs) -> None:
+        _ensure_no_running_loop("acheck_account_session_error")
+        return super().check_account_session_error(*args, **kwargs)
+
+    async def generate_data(self) -> AsyncIterator | Iterable | None:
+        """
+        Генерация данных для выполнения задачи.
+        Переопределяется в дочерних классах: заполняет self.task_data
+        или возвращает итерируемый объект (в том числе асинхронный).
+        """
+        raise NotImplementedError(
+            "Method 'generate_data' must be implemented in subclass"
+        )
+
+    async def verification(self, data):
+        """
+        Проверяет данные перед выполнением первой итерации.
+        """
+        return super().verification(data)
+
+    async def action_runer(self, data) -> bool | None:
+        """
+        Основная логика выполнения действия.
+        Переопределяется в дочерних классах.
+        """
+        raise NotImplementedError(
+            "Method 'action_runer' must be implemented in subclass"
+        )
+
+    async def check_skipped_rules(self, *args, **kwargs) -> bool | None:
+        return super().check_skipped_rules(*args, **kwargs)
+
+    async def _process_task_iteration(self, data):
+        """
+        Обрабатывает одну итерацию задачи.
+        Возвращает True если успешно, или False при неудаче.
+        """
+        with self.profiler.phase("verification"):
+            verified = await self.verification(data)
+        if verified:
+            with self.profiler.phase("action_runer"):
+                return await self.action_runer(data)
+        else:
+            self.logger.error(f"Data verification failed: {data}")
+            return False
+
+    async def _run_async(self, args: tuple, kwargs: dict) -> None:
+        async with httpx.AsyncClient(
+            timeout=settings.ASYNC_TASK_RUNNER_HTTP_TIMEOUT
+        ) as self.http_client:
+            with self.profiler.phase("generate_data", always=True):
+                data = self.chunk_data if self.parent_task_id else await self.generate_data()
+            if data is None:
+                data = self.task_data
+            items = data if hasattr(data, "__aiter__") else _aiter(data)
+
+            first = await anext(items, _NO_DATA)
+            # Если не получены данные таска - прекращаем таск
+            if first is _NO_DATA:
+                self._send_task_result(
+                    message="No data found", progress=100, save_log=True
+                )
+                self.logger.error(f"Task {self.task_id} completed with no data")
+                return
+
+            items = _chain(first, items)
+            if self.chunked and not self.parent_task_id:
+                self._dispatch_chunks(iter([data async for data in items]), args, kwargs)
+                return
+
+            self.concurrency = self.create_concurrency_controller(data)
+            if self.checkpoint:
+                items = self._skip_checkpointed_async(items)
+            await self._run_iterations_async(items)
+            self.completed = not self.is_stopped
+
+    async def _profiled_iteration_async(self, data) -> tuple:
+        # Запросы к БД идут через orm() в другом потоке и здесь не считаются;
+        # время фаз включает ожидание I/O
+        with self.profiler.iteration(count_queries=False), self.counters.track() as counters:
+            return await self._process_task_iteration(data), counters
+
+    async def _skip_checkpointed_async(self, items: AsyncIterator) -> AsyncIterator:
+        async for data in items:
+            if not self.is_checkpointed(data):
+                yield data
+
+    async def _run_iterations_async(self, items: AsyncIterator) -> None:
+        """
+        Держит в работе не больше self.concurrency.limit итераций, новые
+        данные берутся из items по мере завершения предыдущих.
+        """
+        # {task: (время запуска, данные)}
+        in_flight = {}
+        source_error = None
+
+        async def refill():
+            nonlocal source_error
+            while (
+                len(in_flight) < self.concurrency.limit
+                and not self.is_stopped
+                and not self.cancel_flag.is_set()
+            ):
+                if source_error:
+                    return
+                try:
+                    data = await anext(items, _NO_DATA)
+                except Exception as e:
+                    source_error = e
+                    return
+                if data is _NO_DATA:
+                    return
+                task = asyncio.create_task(self._profiled_iteration_async(data))
+                in_flight[task] = (time.monotonic(), data)
+
+        await refill()
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                started, data = in_flight.pop(task)
+                if task.cancelled():
+                    continue
+                if exc := task.exception():
+                    self._report_iteration(started, data, exc=exc)
+                else:
+                    result, counters = task.result()
+                    self._report_iteration(started, data, result=result, counters=counters)
+
+            # Отмена с фронта: снимаем все выполняющиеся итерации
+            if self.cancel_flag.is_set() and not self.is_stopped:
+                self.stop_task()
+            if self.is_stopped:
+                for task in in_flight:
+                    task.cancel()
+                continue
+
+            await refill()
+
+        if source_error:
+            raise source_error
+
+
+def _ensure_no_running_loop(async_name: str) -> None:
+    # В event loop ORM недоступен (SynchronousOnlyOperation), а ошибку
+    # сброса bookkeeping проглотил бы его обработчик
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError(f"Use 'await self.{async_name}(...)' in AsyncBaseTaskRunner coroutines")
+
+
+async def _aiter(iterable: Iterable) -> AsyncIterator:
+    for item in iterable:
+        yield item
+
+
+async def _chain(first, rest: AsyncIterator) -> AsyncIterator:
+    yield first
+    async for item in rest:
+        yield item
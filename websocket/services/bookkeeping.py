@@ -0,0 +1,159 @@
+import logging
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from app import settings
+from app.services.redis_client import get_redis
+from account.models import Account, AccountNotification
+from target.models import InvalidTarget
+
+logger = logging.getLogger(__name__)
+
+# Сбросы InvalidTarget всех процессов выполняются по одному: уникального
+# ограничения на (username, of_id) может не быть, а чтение и вставка
+# двух параллельных сбросов создали бы дубли
+INVALID_TARGETS_LOCK_KEY = "task_bookkeeping:invalid_targets"
+INVALID_TARGETS_LOCK_TIMEOUT = 60
+
+
+class TaskBookkeeping:
+    """
+    Служебные записи задачи: InvalidTarget и AccountNotification.
+
+    Вместо update_or_create / get_or_create на каждую неудачу изменения
+    собираются по ключу и сбрасываются пачками - при накоплении
+    flush_size изменений и в конце задачи:
+    - InvalidTarget: одно чтение, bulk_update и bulk_create
+      под общей для процессов блокировкой;
+    - AccountNotification: недостающие строки создаются одним
+      bulk_create, счётчики существующих увеличиваются на число
+      ошибок через F() одним UPDATE на аккаунт и тип.
+    """
+
+    def __init__(self, task_id: str, flush_size: int | None = None, profiler=None):
+        self.task_id = task_id
+        self._profiler = profiler
+        self.flush_size = flush_size or settings.TASK_BOOKKEEPING_FLUSH_SIZE
+        self._lock = threading.Lock()
+        # Сброс выполняется одним потоком за раз, чтобы не создать дубли
+        self._flush_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        # {(username, of_id): desc} - последняя причина, как при update_or_create
+        self._invalid_targets: dict[tuple, str] = {}
+        # {(account_id, notification_type): число ошибок}
+        self._notifications: dict[tuple, int] = defaultdict(int)
+        self._size = 0
+
+    def add_invalid_target(self, target: dict, desc: str) -> None:
+        key = _invalid_target_key(target.get("username"), target.get("id"))
+        with self._lock:
+            self._invalid_targets[key] = desc
+            self._size += 1
+            full = self._size >= self.flush_size
+        if full:
+            self.flush()
+
+    def add_account_notification(self, account: Account, notification_type) -> None:
+        with self._lock:
+            self._notifications[(account.pk, notification_type)] += 1
+            self._size += 1
+            full = self._size >= self.flush_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._profiler:
+            with self._profiler.phase("bookkeeping_flush", always=True):
+                self._flush()
+        else:
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                invalid_targets = self._invalid_targets
+                notifications = self._notifications
+                self._reset()
+            if invalid_targets:
+                self._write_invalid_targets(invalid_targets)
+            if notifications:
+                self._write_notifications(notifications)
+
+    def _write_invalid_targets(self, changes: dict[tuple, str]) -> None:
+        try:
+            with get_redis().lock(
+                INVALID_TARGETS_LOCK_KEY,
+                timeout=INVALID_TARGETS_LOCK_TIMEOUT,
+                blocking_timeout=INVALID_TARGETS_LOCK_TIMEOUT,
+            ):
+                found = set()
+                to_update = []
+                for invalid_target in InvalidTarget.objects.filter(
+                    of_id__in={of_id for _, of_id in changes}
+                ):
+                    key = (invalid_target.username, invalid_target.of_id)
+                    if key not in changes:
+                        continue
+                    found.add(key)
+                    if invalid_target.desc != changes[key]:
+                        invalid_target.desc = changes[key]
+                        to_update.append(invalid_target)
+                InvalidTarget.objects.bulk_update(to_update, ["desc"], batch_size=500)
+                InvalidTarget.objects.bulk_create(
+                    [
+                        InvalidTarget(username=username, of_id=of_id, desc=desc)
+                        for (username, of_id), desc in changes.items()
+                        if (username, of_id) not in found
+                    ],
+                    batch_size=500,
+                )
+        except Exception as e:
+            logger.error(f"Failed to save {len(changes)} invalid targets for task {self.task_id}: {e}")
+
+    def _write_notifications(self, counts: dict[tuple, int]) -> None:
+        try:
+            with transaction.atomic():
+                existing = {
+                    (account_id, notification_type)
+                    for account_id, notification_type in AccountNotification.objects.filter(
+                        task_id=self.task_id,
+                        account_id__in={account_id for account_id, _ in counts},
+                        notification_type__in={t for _, t in counts},
+                    ).values_list("account_id", "notification_type")
+                } & counts.keys()
+                AccountNotification.objects.bulk_create(
+                    [
+                        AccountNotification(
+                            account_id=account_id,
+                            notification_type=notification_type,
+                            task_id=self.task_id,
+                            counter=count,
+                        )
+                        for (account_id, notification_type), count in counts.items()
+                        if (account_id, notification_type) not in existing
+                    ]
+                )
+                # Строки уведомлений задачи пишет только она сама (ключ
+                # включает task_id), поэтому достаточно блокировки сброса
+                for account_id, notification_type in existing:
+                    AccountNotification.objects.filter(
+                        task_id=self.task_id,
+                        account_id=account_id,
+                        notification_type=notification_type,
+                    ).update(counter=F("counter") + counts[(account_id, notification_type)])
+        except Exception as e:
+            logger.error(f"Failed to save account notifications for task {self.task_id}: {e}")
+
+
+def _invalid_target_key(username, of_id) -> tuple:
+    # Ключи сравниваются со значениями из БД: id из ответа API
+    # может прийти строкой, а of_id в модели - числом
+    return (
+        InvalidTarget._meta.get_field("username").to_python(username),
+        InvalidTarget._meta.get_field("of_id").to_python(of_id),
+    )
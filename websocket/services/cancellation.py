@@ -0,0 +1,70 @@
+import threading
+
+from app import settings
+from app.services.redis_client import get_redis, pubsub_dispatcher
+
+CANCEL_KEY_PREFIX = "task_cancel:"
+CANCEL_CHANNEL = "task_cancel"
+
+
+def request_cancel(task_id: str) -> None:
+    """
+    Отмена задачи пользователем: ключ в Redis (для задач, которые ещё
+    не стартовали или пропустили сообщение) и событие в канал отмены.
+    """
+    pipe = get_redis().pipeline()
+    pipe.set(f"{CANCEL_KEY_PREFIX}{task_id}", 1, ex=settings.TASK_CANCEL_TTL)
+    pipe.publish(CANCEL_CHANNEL, task_id)
+    pipe.execute()
+
+
+def is_cancel_requested(task_id: str) -> bool:
+    return bool(get_redis().exists(f"{CANCEL_KEY_PREFIX}{task_id}"))
+
+
+class CancellationListener:
+    """
+    Подписчик канала отмены (через общий pubsub_dispatcher процесса).
+
+    Выполняющиеся задачи регистрируют свой threading.Event, слушатель
+    выставляет его при получении отмены, поэтому проверка отмены
+    в итерациях задачи - это чтение флага в памяти, без запросов к БД.
+    """
+
+    def __init__(self) -> None:
+        self._events: dict[str, set[threading.Event]] = {}
+        self._lock = threading.Lock()
+        pubsub_dispatcher.subscribe(CANCEL_CHANNEL, self._set, on_connect=self._recheck)
+
+    def register(self, task_id: str, event: threading.Event) -> None:
+        with self._lock:
+            self._events.setdefault(task_id, set()).add(event)
+        pubsub_dispatcher.ensure_running()
+        # Отмена могла прийти до регистрации
+        if is_cancel_requested(task_id):
+            event.set()
+
+    def unregister(self, task_id: str, event: threading.Event) -> None:
+        with self._lock:
+            events = self._events.get(task_id)
+            if events:
+                events.discard(event)
+                if not events:
+                    del self._events[task_id]
+
+    def _set(self, task_id: str) -> None:
+        with self._lock:
+            events = list(self._events.get(task_id, ()))
+        for event in events:
+            event.set()
+
+    def _recheck(self) -> None:
+        # Отмены, пришедшие пока не было подписки
+        with self._lock:
+            task_ids = list(self._events)
+        for task_id in task_ids:
+            if is_cancel_requested(task_id):
+                self._set(task_id)
+
+
+cancellation_listener = CancellationListener()
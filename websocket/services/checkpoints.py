@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+
+from app import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEY_PREFIX = "task_checkpoint:"
+
+
+class TaskCheckpoint:
+    """
+    Контрольная точка задачи в Redis: ключи обработанных элементов
+    (множество) и счётчики (хэш) логической задачи job_key.
+
+    Ключи копятся в памяти и записываются одним pipeline не чаще раза
+    в interval секунд, поэтому после падения воркера повторно
+    выполнится не больше элементов, чем обработано за interval.
+    """
+
+    def __init__(self, job_key: str, interval: float | None = None):
+        self.job_key = job_key
+        self.interval = interval or settings.TASK_CHECKPOINT_INTERVAL
+        self.done: set[str] = set()
+        self.counters: dict[str, int] = {}
+        self._pending: list[str] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def _done_key(self) -> str:
+        return f"{CHECKPOINT_KEY_PREFIX}{self.job_key}:done"
+
+    @property
+    def _counters_key(self) -> str:
+        return f"{CHECKPOINT_KEY_PREFIX}{self.job_key}:counters"
+
+    def load(self) -> bool:
+        """Читает сохранённую точку. True, если задача уже выполнялась"""
+        try:
+            pipe = get_redis().pipeline()
+            pipe.smembers(self._done_key)
+            pipe.hgetall(self._counters_key)
+            done, counters = pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to load checkpoint {self.job_key}: {e}")
+            return False
+        self.done = set(done)
+        self.counters = {name: int(value) for name, value in counters.items()}
+        return bool(self.done or self.counters)
+
+    def is_done(self, item_key: str) -> bool:
+        return item_key in self.done
+
+    def mark(self, item_key: str, counters: dict[str, int]) -> bool:
+        """
+        Отмечает элемент обработанным и добавляет его вклад в счётчики
+        точки. True - пора вызвать flush
+        """
+        with self._lock:
+            self._pending.append(item_key)
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            return time.monotonic() - self._last_flush >= self.interval
+
+    def flush(self) -> None:
+        """
+        Записывает отмеченные элементы и счётчики. В счётчиках только
+        вклад отмеченных элементов: выполнявшиеся в момент сброса при
+        возобновлении выполнятся и посчитаются заново
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            counters = dict(self.counters)
+            self._last_flush = time.monotonic()
+        try:
+            pipe = get_redis().pipeline()
+            if pending:
+                pipe.sadd(self._done_key, *pending)
+            if counters:
+                pipe.hset(self._counters_key, mapping=counters)
+            pipe.expire(self._done_key, settings.TASK_CHECKPOINT_TTL)
+            pipe.expire(self._counters_key, settings.TASK_CHECKPOINT_TTL)
+            pipe.execute()
+        except Exception as e:
+            # Вернём ключи, чтобы записать их при следующем сбросе
+            with self._lock:
+                self._pending = pending + self._pending
+            logger.error(f"Failed to save checkpoint {self.job_key}: {e}")
+
+    def clear(self) -> None:
+        """Задача завершена - точка больше не нужна"""
+        try:
+            get_redis().delete(self._done_key, self._counters_key)
+        except Exception as e:
+            logger.error(f"Failed to clear checkpoint {self.job_key}: {e}")
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+
+from app import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHUNKS_KEY_PREFIX = "task_chunks:"
+
+# Счётчики задачи, которые суммируются по частям
+COUNTER_FIELDS = ("success", "failed", "progress", "iterations")
+
+
+class ChunkProgress:
+    """
+    Общие счётчики задачи, разбитой на части (см. BaseTaskRunner.chunked).
+
+    Каждая часть прибавляет к хэшу в Redis прирост своих счётчиков
+    и читает суммы всех частей не чаще раза в interval секунд, между
+    обновлениями к последним суммам добавляется ещё не отправленный
+    прирост части.
+    """
+
+    def __init__(self, parent_task_id: str, interval: float | None = None):
+        self.parent_task_id = parent_task_id
+        self.key = f"{CHUNKS_KEY_PREFIX}{parent_task_id}"
+        self.interval = interval or settings.TASK_PROGRESS_PUBLISH_INTERVAL
+        self._lock = threading.Lock()
+        self._pushed = dict.fromkeys(COUNTER_FIELDS, 0)
+        self._totals = dict.fromkeys(COUNTER_FIELDS, 0)
+        self._total_steps = 0
+        self._last_sync = 0.0
+
+    def init(self, total_steps: int, chunks: int) -> None:
+        """Вызывается задачей-родителем перед отправкой частей"""
+        pipe = get_redis().pipeline()
+        pipe.delete(self.key)
+        pipe.hset(self.key, mapping={"total_steps": total_steps, "chunks": chunks})
+        pipe.expire(self.key, settings.TASK_SNAPSHOT_TTL)
+        pipe.execute()
+
+    @property
+    def total_steps(self) -> int:
+        return self._total_steps
+
+    def totals(self, local: dict[str, int], force: bool = False) -> dict[str, int]:
+        """Суммы счётчиков всех частей с учётом local - счётчиков этой части"""
+        with self._lock:
+            if force or time.monotonic() - self._last_sync >= self.interval:
+                self._sync(local)
+            return {
+                name: self._totals[name] + local[name] - self._pushed[name]
+                for name in COUNTER_FIELDS
+            }
+
+    def _sync(self, local: dict[str, int]) -> None:
+        self._last_sync = time.monotonic()
+        try:
+            pipe = get_redis().pipeline()
+            for name in COUNTER_FIELDS:
+                if delta := local[name] - self._pushed[name]:
+                    pipe.hincrby(self.key, name, delta)
+            pipe.hgetall(self.key)
+            values = pipe.execute()[-1]
+        except Exception as e:
+            logger.error(f"Failed to sync chunk progress for task {self.parent_task_id}: {e}")
+            return
+        self._pushed = dict(local)
+        self._totals = {name: int(values.get(name, 0)) for name in COUNTER_FIELDS}
+        self._total_steps = int(values.get("total_steps", 0))
+
+    def read(self) -> dict[str, int]:
+        values = get_redis().hgetall(self.key)
+        return {name: int(values.get(name, 0)) for name in COUNTER_FIELDS}
+
+    def read_total_steps(self) -> int:
+        return int(get_redis().hget(self.key, "total_steps") or 0)
+
+    def clear(self) -> None:
+        get_redis().delete(self.key)
@@ -0,0 +1,137 @@
+import threading
+import time
+
+from app import settings
+
+# Виды неудач, которые сообщают контроллеру об итерации
+FAILURE_ERROR = "error"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_RATE_LIMIT = "rate_limit"
+
+# Неудачи, означающие перегрузку внешнего сервиса: на них снижаем сразу
+BACKPRESSURE_FAILURES = (FAILURE_TIMEOUT, FAILURE_RATE_LIMIT)
+
+
+class ConcurrencyController:
+    """
+    Контроллер с постоянным лимитом одновременных итераций.
+
+    Базовый интерфейс для контроллеров BaseTaskRunner: раннер читает
+    limit перед запуском новых итераций и сообщает результат каждой
+    через on_success(latency) или on_failure(kind).
+    """
+
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int | None = None):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or initial)
+        self._limit = min(max(initial, self.min_limit), self.max_limit)
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def on_success(self, latency: float) -> None:
+        pass
+
+    def on_failure(self, kind: str = FAILURE_ERROR, latency: float | None = None) -> None:
+        pass
+
+
+class AIMDConcurrencyController(ConcurrencyController):
+    """
+    Аддитивное увеличение / мультипликативное уменьшение лимита.
+
+    Итерации оцениваются окнами по limit штук. Если в окне доля ошибок
+    не выше max_error_rate и средняя задержка не выросла больше чем
+    в latency_tolerance раз относительно лучшей, лимит растёт на 1
+    (до первого снижения - удваивается, чтобы быстро выйти на рабочий
+    уровень). Иначе, а также сразу при таймауте или rate limit, лимит
+    умножается на backoff. Подряд идущие снижения не чаще раза за среднюю
+    задержку итерации, чтобы одна волна ошибок не обнулила лимит.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int | None = None,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        max_error_rate: float = 0.1,
+    ):
+        super().__init__(initial, min_limit, max_limit)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        # Лучшая средняя задержка окна, медленно дрейфует вверх
+        self._baseline: float | None = None
+        self._avg_latency = 0.0
+        self._last_decrease = 0.0
+        self._slow_start = True
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self._completed = 0
+        self._errors = 0
+        self._latency_sum = 0.0
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            self._record(latency)
+
+    def on_failure(self, kind: str = FAILURE_ERROR, latency: float | None = None) -> None:
+        with self._lock:
+            if kind in BACKPRESSURE_FAILURES:
+                self._decrease()
+                self._reset_window()
+                return
+            self._errors += 1
+            self._record(latency)
+
+    def _record(self, latency: float | None) -> None:
+        self._completed += 1
+        if latency is not None:
+            self._latency_sum += latency
+        if self._completed < self._limit:
+            return
+
+        avg = self._latency_sum / self._completed
+        self._avg_latency = avg
+        if self._baseline is None or avg < self._baseline:
+            self._baseline = avg
+        else:
+            self._baseline *= 1.05
+
+        overloaded = (
+            self._errors / self._completed > self.max_error_rate
+            or avg > self._baseline * self.latency_tolerance
+        )
+        if overloaded:
+            self._decrease()
+        else:
+            step = self._limit if self._slow_start else 1
+            self._limit = min(self._limit + step, self.max_limit)
+        self._reset_window()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self._avg_latency:
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self._limit = max(int(self._limit * self.backoff), self.min_limit)
+
+
+def create_controller(
+    controller_class: type[ConcurrencyController],
+    initial: int | None = None,
+    min_limit: int | None = None,
+    max_limit: int | None = None,
+) -> ConcurrencyController:
+    """Контроллер с лимитами задачи или значениями из настроек"""
+    return controller_class(
+        initial=initial or settings.TASK_CONCURRENCY_INITIAL,
+        min_limit=min_limit or settings.TASK_CONCURRENCY_MIN,
+        max_limit=max_limit or settings.TASK_CONCURRENCY_MAX,
+    )
@@ -0,0 +1,133 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+# Увеличения счётчиков текущей итерации (см. TaskCounters.track)
+_tracked: ContextVar[dict[str, int] | None] = ContextVar("tracked_counters", default=None)
+
+
+class ShardedCounter:
+    """
+    Счётчик, который потоки увеличивают без общей блокировки.
+
+    Каждый поток пишет только в свой шард, значение - сумма шардов
+    на момент чтения. Блокировка берётся лишь при первом обращении
+    потока (регистрация шарда) и при сбросе.
+    """
+
+    def __init__(self, value: int = 0, name: str | None = None):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset(value)
+
+    def _shard(self) -> list[int]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0]
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def incr(self, n: int = 1) -> None:
+        self._shard()[0] += n
+        if self.name and (tracked := _tracked.get()) is not None:
+            tracked[self.name] = tracked.get(self.name, 0) + n
+
+    @property
+    def value(self) -> int:
+        with self._lock:
+            shards = list(self._shards)
+        return self._base + sum(shard[0] for shard in shards)
+
+    def reset(self, value: int = 0) -> None:
+        with self._lock:
+            self._base = value
+            self._shards: list[list[int]] = []
+            self._local = threading.local()
+
+
+class CounterValue(int):
+    """
+    Значение счётчика, которое отдаёт CounterField. `+=` и `-=`
+    увеличивают сам счётчик (incr), а не присваивают ему сумму,
+    поэтому конкурентные увеличения из других потоков не теряются.
+    """
+
+    def __new__(cls, value: int, counter: ShardedCounter, applied: bool = False):
+        obj = super().__new__(cls, value)
+        obj.counter = counter
+        # Результат `+=`: увеличение уже выполнено, присваивать нечего
+        obj.applied = applied
+        return obj
+
+    def __iadd__(self, n: int) -> "CounterValue":
+        self.counter.incr(n)
+        return CounterValue(int(self) + n, self.counter, applied=True)
+
+    def __isub__(self, n: int) -> "CounterValue":
+        self.counter.incr(-n)
+        return CounterValue(int(self) - n, self.counter, applied=True)
+
+
+class CounterField:
+    """
+    Атрибут задачи, хранящийся в ShardedCounter из self.counters.
+    `self.count_success += 1` увеличивает счётчик (см. CounterValue),
+    обычное присваивание `self.count_success = 0` его сбрасывает.
+    """
+
+    def __init__(self, counter_name: str):
+        self.counter_name = counter_name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        counter = getattr(instance.counters, self.counter_name)
+        return CounterValue(counter.value, counter)
+
+    def __set__(self, instance, value: int) -> None:
+        counter = getattr(instance.counters, self.counter_name)
+        if isinstance(value, CounterValue) and value.applied and value.counter is counter:
+            return
+        counter.reset(int(value))
+
+
+class TaskCounters:
+    """Счётчики прогресса задачи"""
+
+    def __init__(self):
+        self.success = ShardedCounter(name="success")
+        self.failed = ShardedCounter(name="failed")
+        self.progress = ShardedCounter(name="progress")
+        self.iterations = ShardedCounter(name="iterations")
+
+    def _all(self) -> dict[str, ShardedCounter]:
+        return {
+            "success": self.success,
+            "failed": self.failed,
+            "progress": self.progress,
+            "iterations": self.iterations,
+        }
+
+    def reset(self, values: dict[str, int] | None = None) -> None:
+        values = values or {}
+        for name, counter in self._all().items():
+            counter.reset(values.get(name, 0))
+
+    def snapshot(self) -> dict[str, int]:
+        return {name: counter.value for name, counter in self._all().items()}
+
+    @contextmanager
+    def track(self) -> Iterator[dict[str, int]]:
+        """
+        Собирает увеличения счётчиков, сделанные внутри блока в текущем
+        потоке или корутине, - вклад одной итерации задачи.
+        """
+        tracked = {}
+        token = _tracked.set(tracked)
+        try:
+            yield tracked
+        finally:
+            _tracked.reset(token)
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from itertools import islice
+from typing import Iterable, Iterator
+
+from channels.layers import get_channel_layer
+
+from app import settings
+from authenticate.models import User
+from notification.models import BroadcastMessage
+from websocket.services.async_bridge import async_bridge
+from websocket.services.frames import frame_event, notification_payload
+
+logger = logging.getLogger(__name__)
+
+
+def iter_chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    """
+    Разбивает итерируемый объект на списки длиной не больше size,
+    не материализуя исходные данные целиком.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class NotificationFanout:
+    """
+    Рассылка уведомления всем активным пользователям.
+
+    Текст сохраняется один раз в BroadcastMessage, доставка каждому
+    пользователю отмечается в BroadcastReceipt после подтверждения.
+    ID пользователей читаются из БД потоком по chunk_size штук, а отправка
+    в channel layer идёт в постоянном event loop процесса (async_bridge):
+    пока отправляется текущий чанк, из БД уже вычитывается следующий.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        m_type: str = "info",
+        chunk_size: int | None = None,
+        concurrency: int | None = None,
+        channel_layer=None,
+    ) -> None:
+        self.message = message
+        self.m_type = m_type
+        self.chunk_size = chunk_size or settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+        self.concurrency = concurrency or settings.NOTIFICATION_FANOUT_CONCURRENCY
+        self.channel_layer = channel_layer or get_channel_layer()
+        self.broadcast = None
+        self.sent = 0
+        self.failed = 0
+
+    def run(self) -> int:
+        """
+        Запускает рассылку из синхронного кода (Celery-таска).
+        Возвращает количество получателей.
+        """
+        self.broadcast = BroadcastMessage.objects.create(
+            message=self.message, message_type=self.m_type
+        )
+        event = self.build_event()
+
+        # Чтение из БД остаётся в потоке таски, отправка идёт
+        # в event loop процесса (async_bridge)
+        pending = None
+        for user_ids in iter_chunks(self.get_user_ids(), self.chunk_size):
+            if pending:
+                pending.result()
+            pending = async_bridge.submit(self._send_chunk(user_ids, event))
+        if pending:
+            pending.result()
+
+        logger.info(
+            f"Broadcast fan-out finished: sent={self.sent}, failed={self.failed}"
+        )
+        return self.sent + self.failed
+
+    def get_user_ids(self) -> Iterator[int]:
+        return (
+            User.objects.filter(is_active=True)
+            .order_by("id")
+            .values_list("id", flat=True)
+            .iterator(chunk_size=self.chunk_size)
+        )
+
+    def build_event(self) -> dict:
+        # Кадр кодируется один раз на всю рассылку
+        return frame_event(
+            "send_notification",
+            notification_payload(
+                self.message, self.m_type, None, broadcast_id=self.broadcast.id
+            ),
+        )
+
+    async def _send_chunk(self, user_ids: list[int], event: dict) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(user_id: int) -> None:
+            async with semaphore:
+                await self.channel_layer.group_send(f"user_{user_id}", event)
+
+        results = await asyncio.gather(
+            *(send(user_id) for user_id in user_ids),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.failed += 1
+                logger.error(f"Broadcast fan-out send failed: {result}")
+            else:
+                self.sent += 1
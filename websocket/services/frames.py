@@ -0,0 +1,102 @@
+import json
+import logging
+
+import msgpack
+import orjson
+
+from app import settings
+
+logger = logging.getLogger(__name__)
+
+# Подпротокол WebSocket, которым клиент запрашивает бинарные msgpack-кадры
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+
+def encode(payload: dict) -> str:
+    """Кодирование кадра в JSON (orjson, с откатом на stdlib json)"""
+    try:
+        return orjson.dumps(payload).decode()
+    except orjson.JSONEncodeError:
+        return json.dumps(payload)
+
+
+def encode_binary(payload: dict) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def decode_binary(data: bytes):
+    return msgpack.unpackb(data, raw=False)
+
+
+def frame_to_binary(frame: str) -> bytes:
+    """Перекодирование готового JSON-кадра для msgpack-клиента"""
+    return encode_binary(orjson.loads(frame))
+
+
+def frame_event(event_type: str, payload: dict) -> dict:
+    """
+    Событие channel layer с уже сериализованным кадром.
+
+    Кадр кодируется один раз на стороне отправителя, консьюмеры
+    пересылают его клиентам без изменений. msgpack-версия кадра
+    добавляется только при включённом WEBSOCKET_BINARY_FRAMES,
+    иначе консьюмер msgpack-клиента перекодирует кадр сам.
+    """
+    event = {"type": event_type, "frame": encode(payload)}
+    if settings.WEBSOCKET_BINARY_FRAMES:
+        event["frame_bin"] = encode_binary(payload)
+    return event
+
+
+def notification_payload(
+    message: str,
+    m_type: str,
+    notification_id: int | None,
+    broadcast_id: int | None = None,
+) -> dict:
+    # У broadcast своя последовательность id (BroadcastMessage), поэтому
+    # он передаётся в broadcast_id, а notification_id остаётся пустым
+    is_broadcast = broadcast_id is not None
+    return {
+        "message": message,
+        "m_type": m_type,
+        "notification_id": notification_id,
+        "broadcast_id": broadcast_id,
+        "is_broadcast": is_broadcast,
+        "channel": "broadcast" if is_broadcast else "notifications",
+    }
+
+
+def legacy_notification_payload(payload: dict) -> dict:
+    """
+    Уведомление для старых маршрутов: их клиенты подтверждают доставку
+    только по notification_id, поэтому broadcast передаётся в нём как
+    -broadcast_id (см. AcknowledgementBuffer)
+    """
+    if payload.get("broadcast_id") is None:
+        return payload
+    return {**payload, "notification_id": -payload["broadcast_id"]}
+
+
+# Поле status, которое клиент получает для разных типов событий задачи
+TASK_STATUSES = {
+    "task_canceled": "canceled",
+    "process_finished": "finished",
+}
+
+
+def task_payload(event: dict) -> dict:
+    payload = {
+        "message": event.get("message", ""),
+        "message_error": event.get("message_error", ""),
+        "progress": event["progress"],
+        "iteration": event["iteration"],
+        "success_iteration": event["success_iteration"],
+        "error_iteration": event["error_iteration"],
+        "data": event.get("data", {}),
+        "concurrency": event.get("concurrency"),
+        "channel": f"task:{event.get('task_id', '')}",
+    }
+    if status := TASK_STATUSES.get(event.get("type")):
+        payload = {"status": status, **payload}
+    return payload
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+
+from app import settings
+from app.services.redis_client import get_async_redis, get_redis
+from websocket.services.frames import encode_binary
+
+logger = logging.getLogger(__name__)
+
+# Кадр ping кодируется один раз на процесс
+PING_FRAME = json.dumps({"type": "ping"})
+PING_FRAME_BINARY = encode_binary({"type": "ping"})
+
+CONNECTIONS_KEY_PREFIX = "websocket:connections:"
+
+
+class HeartbeatService:
+    """
+    Heartbeat всех WebSocket-соединений процесса на одном таймере.
+
+    Соединения распределяются по корзинам по кругу. Каждые
+    interval / buckets секунд пингуется одна корзина, так что каждое
+    соединение получает ping раз в interval секунд, а нагрузка размазана
+    равномерно.
+
+    Клиент, хотя бы раз ответивший {"type": "pong"}, отключается после
+    max_missed пингов подряд без входящих сообщений. Клиенты, которые
+    pong не отправляют, только пингуются, как и раньше.
+    """
+
+    def __init__(
+        self,
+        interval: int | None = None,
+        buckets: int | None = None,
+        max_missed: int | None = None,
+    ) -> None:
+        self.interval = interval or settings.WEBSOCKET_HEARTBEAT_INTERVAL
+        self.buckets = [set() for _ in range(buckets or settings.WEBSOCKET_HEARTBEAT_BUCKETS)]
+        self.max_missed = max_missed or settings.WEBSOCKET_HEARTBEAT_MAX_MISSED
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # consumer -> номер корзины
+        self._bucket_of = {}
+        # consumer -> пропущенные pong (None, если клиент pong не поддерживает)
+        self._missed = {}
+        self._next_bucket = 0
+        self._task: asyncio.Task | None = None
+
+    def register(self, consumer) -> None:
+        index = self._next_bucket
+        self._next_bucket = (self._next_bucket + 1) % len(self.buckets)
+        self.buckets[index].add(consumer)
+        self._bucket_of[consumer] = index
+        self._missed[consumer] = None
+        self._ensure_running()
+
+    def unregister(self, consumer) -> None:
+        index = self._bucket_of.pop(consumer, None)
+        if index is not None:
+            self.buckets[index].discard(consumer)
+        self._missed.pop(consumer, None)
+
+    def alive(self, consumer) -> None:
+        """Любое входящее сообщение от клиента сбрасывает счётчик пропусков"""
+        if self._missed.get(consumer) is not None:
+            self._missed[consumer] = 0
+
+    def pong(self, consumer) -> None:
+        if consumer in self._missed:
+            self._missed[consumer] = 0
+
+    @property
+    def connections_count(self) -> int:
+        return len(self._bucket_of)
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        tick = self.interval / len(self.buckets)
+        index = 0
+        while True:
+            while self._bucket_of:
+                await asyncio.sleep(tick)
+                await self._ping_bucket(self.buckets[index])
+                index = (index + 1) % len(self.buckets)
+                if index == 0:
+                    await self._report_connections()
+            await self._report_connections()
+            # Соединение, подключившееся во время последнего отчёта, видело
+            # ещё не завершённую задачу и новую не запустило
+            if not self._bucket_of:
+                return
+
+    async def _ping_bucket(self, bucket: set) -> None:
+        consumers = list(bucket)
+        if not consumers:
+            return
+        await asyncio.gather(
+            *(self._ping(consumer) for consumer in consumers),
+            return_exceptions=True,
+        )
+
+    async def _ping(self, consumer) -> None:
+        missed = self._missed.get(consumer)
+        if missed is not None and missed >= self.max_missed:
+            logger.warning(f"Closing dead websocket peer {consumer.channel_name}")
+            self.unregister(consumer)
+            await consumer.close()
+            return
+        if missed is not None:
+            self._missed[consumer] = missed + 1
+        if getattr(consumer, "binary", False):
+            await consumer.send(bytes_data=PING_FRAME_BINARY)
+        else:
+            await consumer.send(text_data=PING_FRAME)
+
+    async def _report_connections(self) -> None:
+        # Количество соединений процесса публикуется в Redis с TTL,
+        # чтобы его можно было прочитать из любого процесса
+        try:
+            await get_async_redis().set(
+                f"{CONNECTIONS_KEY_PREFIX}{self.worker_id}",
+                self.connections_count,
+                ex=self.interval * 3,
+            )
+        except Exception as e:
+            logger.error(f"Failed to report websocket connections count: {e}")
+
+
+def get_connections_by_worker() -> dict[str, int]:
+    """Количество WebSocket-соединений по процессам ASGI"""
+    client = get_redis()
+    return {
+        key.removeprefix(CONNECTIONS_KEY_PREFIX): int(client.get(key) or 0)
+        for key in client.scan_iter(f"{CONNECTIONS_KEY_PREFIX}*")
+    }
+
+
+heartbeat = HeartbeatService()
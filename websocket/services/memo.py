@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from functools import update_wrapper
+from typing import Iterable
+
+from django.db.models.signals import post_delete, post_save
+
+from app import settings
+from app.services.redis_client import get_redis, pubsub_dispatcher
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_CHANNEL = "memo_invalidate"
+STATS_KEY_PREFIX = "memo_stats:"
+
+
+class MemoizedLookup:
+    """
+    Кэш результата функции в памяти процесса с TTL.
+
+    Для справочных данных, которые читаются на каждой итерации задачи,
+    но почти не меняются. Значение сбрасывается по истечении ttl или
+    сразу при invalidate(name) из любого процесса (через Redis pub/sub),
+    в том числе при сохранении и удалении объектов моделей models.
+    Одновременные промахи в разных потоках вызывают функцию один раз.
+    """
+
+    def __init__(self, func, name: str, ttl: float | None = None):
+        self.func = func
+        self.name = name
+        self.ttl = ttl or settings.MEMO_DEFAULT_TTL
+        # {аргументы: (значение, время истечения)}
+        self._values: dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # Растёт при каждом сбросе, чтобы не сохранить значение,
+        # прочитанное до сброса
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        if (value := self._get(key)) is not None:
+            return value[0]
+
+        # Подписка на сбросы нужна только процессу, который читает кэш
+        pubsub_dispatcher.ensure_running()
+        with self._load_lock:
+            # Значение мог загрузить другой поток, пока ждали блокировку
+            if (value := self._get(key)) is not None:
+                return value[0]
+            with self._lock:
+                self.misses += 1
+                generation = self._generation
+            result = self.func(*args, **kwargs)
+            with self._lock:
+                if generation == self._generation:
+                    self._values[key] = (result, time.monotonic() + self.ttl)
+            return result
+
+    def _get(self, key: tuple) -> tuple | None:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return (entry[0],)
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._values),
+                "ttl": self.ttl,
+            }
+
+
+# {имя: MemoizedLookup} - все кэши процесса
+_registry: dict[str, MemoizedLookup] = {}
+# {app_label.Model: имена кэшей, которые сбрасываются при её изменении}
+_models: dict[str, set[str]] = {}
+
+
+def memoized(name: str, ttl: float | None = None, models: Iterable[str] = ()):
+    """
+    Декоратор: кэширует функцию под именем name. Сохранение или удаление
+    объекта одной из моделей models (app_label.Model) сбрасывает кэш
+    во всех процессах. Массовые queryset.update() и bulk_create() сигналов
+    не отправляют - после них нужен явный invalidate(name).
+
+        skipped_types = memoized("invalid_target_skipped_types")(get_skipped_types)
+    """
+
+    def decorator(func) -> MemoizedLookup:
+        lookup = MemoizedLookup(func, name, ttl)
+        _registry[name] = lookup
+        for label in models:
+            _models.setdefault(label, set()).add(name)
+        return lookup
+
+    return decorator
+
+
+def invalidate(name: str) -> None:
+    """
+    Сбрасывает кэш name во всех процессах.
+    Вызывать после изменения данных, которые он кэширует.
+    """
+    _clear(name)
+    try:
+        get_redis().publish(INVALIDATE_CHANNEL, name)
+    except Exception as e:
+        logger.error(f"Failed to publish memo invalidation for {name}: {e}")
+
+
+def memo_stats() -> dict[str, dict]:
+    return {name: lookup.stats() for name, lookup in _registry.items()}
+
+
+def report_stats() -> None:
+    """
+    Публикует статистику кэшей процесса в Redis с TTL,
+    чтобы её можно было прочитать из любого процесса
+    """
+    if not _registry:
+        return
+    try:
+        get_redis().set(
+            f"{STATS_KEY_PREFIX}{socket.gethostname()}:{os.getpid()}",
+            json.dumps(memo_stats()),
+            ex=settings.MEMO_STATS_TTL,
+        )
+    except Exception as e:
+        logger.error(f"Failed to report memo stats: {e}")
+
+
+def get_memo_stats_by_worker() -> dict[str, dict]:
+    """Статистика кэшей по процессам, опубликованная report_stats()"""
+    client = get_redis()
+    stats = {}
+    for key in client.scan_iter(f"{STATS_KEY_PREFIX}*"):
+        if value := client.get(key):
+            stats[key.removeprefix(STATS_KEY_PREFIX)] = json.loads(value)
+    return stats
+
+
+def _on_model_change(sender, **kwargs) -> None:
+    for name in _models.get(sender._meta.label, ()):
+        invalidate(name)
+
+
+def _clear(name: str) -> None:
+    if lookup := _registry.get(name):
+        lookup.clear()
+
+
+def _clear_all() -> None:
+    # Сбросы, пропущенные пока не было подписки
+    for lookup in list(_registry.values()):
+        lookup.clear()
+
+
+pubsub_dispatcher.subscribe(INVALIDATE_CHANNEL, _clear, on_connect=_clear_all)
+post_save.connect(_on_model_change, dispatch_uid="memo_invalidate_on_save")
+post_delete.connect(_on_model_change, dispatch_uid="memo_invalidate_on_delete")
@@ -0,0 +1,149 @@
+import bisect
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.db import connection
+
+from app import settings
+
+# Границы корзин гистограмм: миллисекунды для фаз, штуки для запросов к БД
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Попала ли текущая итерация (поток или корутина) в выборку
+_sampled: ContextVar[bool] = ContextVar("task_profiler_sampled", default=False)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает q-й процентиль"""
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return 0.0
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": round(self.max, 3),
+            "buckets": dict(zip([*map(str, self.buckets), "inf"], self.counts)),
+        }
+
+
+class TaskProfiler:
+    """
+    Профилирование фаз задачи: время (wall и CPU потока), число
+    запросов к БД за итерацию и ожидание в очереди пула.
+
+    Итерации попадают в выборку с вероятностью sample_rate
+    (TASK_PROFILE_SAMPLE_RATE), только для них меряются фазы внутри
+    итерации и считаются запросы. Фазы уровня задачи (генерация данных,
+    запись архива) меряются всегда - их мало.
+    """
+
+    def __init__(self, sample_rate: float | None = None):
+        self.sample_rate = settings.TASK_PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self._lock = threading.Lock()
+        # {фаза: (гистограмма wall, суммарное CPU время в мс)}
+        self._phases: dict[str, list] = {}
+        self._queries = Histogram(QUERY_BUCKETS)
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def _record(self, name: str, wall_ms: float, cpu_ms: float) -> None:
+        with self._lock:
+            phase = self._phases.get(name)
+            if phase is None:
+                phase = self._phases[name] = [Histogram(LATENCY_BUCKETS_MS), 0.0]
+            phase[0].add(wall_ms)
+            phase[1] += cpu_ms
+
+    @contextmanager
+    def _measure(self, name: str):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self._record(
+                name,
+                (time.perf_counter() - wall) * 1000,
+                (time.thread_time() - cpu) * 1000,
+            )
+
+    def phase(self, name: str, always: bool = False):
+        """
+        Контекст замера фазы. Внутри итерации меряется только
+        для итераций из выборки, always=True - всегда.
+        """
+        if always and self.enabled or _sampled.get():
+            return self._measure(name)
+        return nullcontext()
+
+    def record_wait(self, name: str, seconds: float) -> None:
+        if _sampled.get():
+            self._record(name, seconds * 1000, 0.0)
+
+    @contextmanager
+    def iteration(self, count_queries: bool = True):
+        """
+        Итерация задачи: решает, попала ли она в выборку, и считает
+        запросы к БД текущего потока (в корутинах count_queries=False)
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield
+            return
+
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        token = _sampled.set(True)
+        wrapper = connection.execute_wrapper(count_query) if count_queries else nullcontext()
+        try:
+            with wrapper, self._measure("iteration"):
+                yield
+        finally:
+            _sampled.reset(token)
+            if count_queries:
+                with self._lock:
+                    self._queries.add(queries)
+
+    def summary(self) -> dict:
+        with self._lock:
+            phases = {
+                name: {**histogram.summary(), "cpu_total_ms": round(cpu_ms, 3)}
+                for name, (histogram, cpu_ms) in self._phases.items()
+            }
+            return {
+                "sample_rate": self.sample_rate,
+                "phases_ms": phases,
+                "db_queries_per_iteration": self._queries.summary(),
+            }
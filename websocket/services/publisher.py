@@ -0,0 +1,91 @@
+import logging
+import threading
+
+from channels.layers import get_channel_layer
+
+from app import settings
+from websocket.services.async_bridge import async_bridge
+from websocket.services.snapshots import save_snapshot
+
+logger = logging.getLogger(__name__)
+
+# События, которые отправляются сразу и никогда не схлопываются
+TERMINAL_EVENTS = ("process_finished", "task_canceled")
+
+
+class TaskProgressPublisher:
+    """
+    Отправка прогресса задачи в channel layer из отдельного потока.
+
+    Потоки задачи только кладут событие в очередь и не ждут Redis.
+    Поток публикатора отправляет накопленное через event loop процесса
+    (async_bridge) не чаще раза в interval секунд, причём из подряд
+    идущих промежуточных событий уходит только последнее. Финальные события
+    (TERMINAL_EVENTS) отправляются немедленно и в порядке поступления.
+
+    Последнее отправленное событие сохраняется как снимок прогресса
+    задачи (см. websocket.services.snapshots).
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        group_name: str,
+        channel_layer=None,
+        interval: float | None = None,
+    ):
+        self.task_id = task_id
+        self.group_name = group_name
+        self.channel_layer = channel_layer or get_channel_layer()
+        self.interval = interval or settings.TASK_PROGRESS_PUBLISH_INTERVAL
+        # [(событие, финальное ли)]
+        self._pending: list[tuple[dict, bool]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"publisher-{group_name}", daemon=True
+        )
+        self._thread.start()
+
+    def publish(self, event: dict) -> None:
+        terminal = event.get("type") in TERMINAL_EVENTS
+        with self._lock:
+            if not terminal and self._pending and not self._pending[-1][1]:
+                # Более новое промежуточное событие заменяет неотправленное
+                self._pending[-1] = (event, False)
+            else:
+                self._pending.append((event, terminal))
+        if terminal:
+            self._wakeup.set()
+
+    def close(self, timeout: float = 10) -> None:
+        """Отправляет всё накопленное и останавливает поток"""
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                self._flush(batch)
+            if self._closed and not self._pending:
+                break
+
+    def _flush(self, batch: list[tuple[dict, bool]]) -> None:
+        try:
+            async_bridge.run(self._send(batch), settings.CHANNEL_SEND_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Failed to publish task progress to {self.group_name}: {e}")
+        save_snapshot(self.task_id, batch[-1][0])
+
+    async def _send(self, batch: list[tuple[dict, bool]]) -> None:
+        for event, _ in batch:
+            try:
+                await self.channel_layer.group_send(self.group_name, event)
+            except Exception as e:
+                logger.error(f"Failed to publish task progress to {self.group_name}: {e}")
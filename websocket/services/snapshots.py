@@ -0,0 +1,49 @@
+import json
+import logging
+
+from app import settings
+from app.services.redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY_PREFIX = "task_snapshot:"
+
+
+def _key(task_id: str) -> str:
+    return f"{SNAPSHOT_KEY_PREFIX}{task_id}"
+
+
+def save_snapshot(task_id: str, event: dict) -> None:
+    """
+    Сохраняет последнее отправленное событие задачи (тип и готовый кадр)
+    в хэше Redis с TTL, чтобы отдать его клиенту, подключившемуся позже.
+    """
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hset(_key(task_id), mapping={"type": event["type"], "frame": event["frame"]})
+        pipe.expire(_key(task_id), settings.TASK_SNAPSHOT_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to save snapshot for task {task_id}: {e}")
+
+
+def get_snapshot(task_id: str) -> dict | None:
+    """Последний кадр задачи в виде словаря (для HTTP API)"""
+    try:
+        frame = get_redis().hget(_key(task_id), "frame")
+    except Exception as e:
+        logger.error(f"Failed to read snapshot for task {task_id}: {e}")
+        return None
+    return json.loads(frame) if frame else None
+
+
+async def aget_snapshot_event(task_id: str) -> dict | None:
+    """Последнее событие задачи в формате channel layer (для консьюмеров)"""
+    try:
+        snapshot = await get_async_redis().hgetall(_key(task_id))
+    except Exception as e:
+        logger.error(f"Failed to read snapshot for task {task_id}: {e}")
+        return None
+    if not snapshot:
+        return None
+    return {"type": snapshot["type"], "frame": snapshot["frame"]}
@@ -1,15 +1,18 @@
+import itertools
+import json
 import threading
-from typing import Optional
+import time
+from typing import Iterator, Optional
 
-from celery.result import AsyncResult
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 import concurrent.futures
 import logging
-from celery import Task
-from django.db import close_old_connections, transaction
+import httpx
+from celery import Task, chord, group, signature
+from django.db import close_old_connections
 
-from account.models import Account, NotificationType, AccountNotification
+from app import settings
+from account.models import Account, NotificationType
 from archive.models import Archive
 from authenticate.models import User
 from ofauth.services.getters import get_invalid_target_skipped_types
@@ -17,29 +20,107 @@ from ofauth.validators.response import (
     OFAuthAPIClientResponse,
     InternalVerificationResponse,
 )
-from target.models import InvalidTarget
 from websocket.consumers import send_notification_to_user
+from websocket.services.archive_writer import ArchiveWriter
+from websocket.services.bookkeeping import TaskBookkeeping
+from websocket.services.cancellation import cancellation_listener
+from websocket.services.checkpoints import TaskCheckpoint
+from websocket.services.chunks import ChunkProgress
+from websocket.services.concurrency import (
+    AIMDConcurrencyController,
+    ConcurrencyController,
+    FAILURE_ERROR,
+    FAILURE_RATE_LIMIT,
+    FAILURE_TIMEOUT,
+    create_controller,
+)
+from websocket.services.counters import CounterField, TaskCounters
+from websocket.services.fanout import iter_chunks
+from websocket.services.frames import frame_event, task_payload
+from websocket.services import memo
+from websocket.services.memo import memoized
+from websocket.services.profiling import TaskProfiler
+from websocket.services.publisher import TaskProgressPublisher
+
+# Маркер исчерпанного итератора данных задачи
+_NO_DATA = object()
+
+# Типы ошибок, для которых не сохраняется InvalidTarget. Меняются редко:
+# кэш сбрасывается при изменении моделей INVALID_TARGET_SKIPPED_TYPES_MODELS
+skipped_target_types = memoized(
+    "invalid_target_skipped_types",
+    models=settings.INVALID_TARGET_SKIPPED_TYPES_MODELS,
+)(get_invalid_target_skipped_types)
 
 
 class BaseTaskRunner(Task):
+    # Контроллер числа одновременных итераций и его лимиты для задачи
+    # (None - значения TASK_CONCURRENCY_* из настроек)
+    concurrency_controller_class: type[ConcurrencyController] = AIMDConcurrencyController
+    concurrency_initial: int | None = None
+    concurrency_min: int | None = None
+    concurrency_max: int | None = None
+
+    # Счётчики увеличиваются из потоков итераций без общей блокировки,
+    # `self.count_success += 1` остаётся точным (см. CounterField)
+    count_success = CounterField("success")
+    count_failed = CounterField("failed")
+    progress = CounterField("progress")
+    total_iterations = CounterField("iterations")
+
+    # Сохранять обработанные элементы и счётчики в Redis и продолжать
+    # с места остановки при перезапуске той же задачи (см. get_job_key,
+    # get_item_key). Таким задачам включаются acks_late и
+    # reject_on_worker_lost (см. __init_subclass__): сообщение прерванной
+    # задачи возвращается в очередь и выполняется с тем же id.
+    checkpoint_enabled = False
+
+    # Разбивать данные задачи на части по chunk_size элементов и выполнять
+    # их отдельными задачами Celery на разных воркерах (group + chord).
+    # Элементы данных должны сериализоваться в JSON
+    chunked = False
+    chunk_size: int | None = None
+
+    # Долгие задачи и их части идут в отдельную очередь со своим пулом
+    # воркеров и не задерживают уведомления (см. CELERY_TASK_ROUTES)
+    queue = settings.CELERY_BULK_QUEUE
+
     def __init__(self, *args, **kwargs):
         self.logger = logging.getLogger(__name__)
         self.user_id = kwargs.get("user_id")
         self.channel_layer = get_channel_layer()
         self.group_name = None
+        self.publisher = None
+        self.archive_writer = None
+        self.bookkeeping = None
+        self.checkpoint: TaskCheckpoint | None = None
+        self.completed = False
+        self.concurrency: ConcurrencyController | None = None
+        self.profiler: TaskProfiler | None = None
         self.task_id = None
+        self.parent_task_id = None
+        self.chunk_data = None
+        self.chunk_progress: ChunkProgress | None = None
         self.user = None
-        self.count_success = 0
-        self.count_failed = 0
-        self.progress = 0
-        self.total_iterations = 0
+        self.counters = TaskCounters()
         self.dynamic_total_steps = 0
         self.result = {}
         self.is_stopped = False
         self.cancel_flag = threading.Event()  # Флаг отмены
+        self._stop_lock = threading.Lock()
         self.task_data = []
         super().__init__()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Без повторной доставки сообщения точка не пригодится: задача
+        # продолжится, только если Celery перезапустит её с тем же id
+        if cls.checkpoint_enabled:
+            if "acks_late" not in cls.__dict__:
+                cls.acks_late = True
+            if "reject_on_worker_lost" not in cls.__dict__:
+                cls.reject_on_worker_lost = True
+
     def run_task(self, *args, **kwargs):
         """
         Запуск задачи Celery с параллельной обработкой логики.
@@ -50,79 +131,312 @@ class BaseTaskRunner(Task):
         self.setup_task(*args, **kwargs)  # Установить параметры задачи
 
         try:
-            self.generate_data()  # Генерация данных для выполнения задачи
+            # Генерация данных для выполнения задачи: список в self.task_data
+            # или итератор, возвращённый из generate_data.
+            # Часть разбитой задачи получает свои данные от родителя
+            with self.profiler.phase("generate_data", always=True):
+                data = self.chunk_data if self.parent_task_id else self.generate_data()
+            if data is None:
+                data = self.task_data
+
+            items = iter(data)
+            first = next(items, _NO_DATA)
 
             # Если не получены данные таска - прекращаем таск
-            if not self.task_data:
+            if first is _NO_DATA:
                 self._send_task_result(
                     message="No data found", progress=100, save_log=True
                 )
                 self.logger.error(f"Task {self.task_id} completed with no data")
                 return self.result
 
+            if self.chunked and not self.parent_task_id:
+                self._dispatch_chunks(itertools.chain([first], items), args, kwargs)
+                return self.result
+
+            self.concurrency = self.create_concurrency_controller(data)
+
+            items = itertools.chain([first], items)
+            if self.checkpoint:
+                items = (data for data in items if not self.is_checkpointed(data))
+
             # Запускаем многопоточно основной цикл таска
-            with concurrent.futures.ThreadPoolExecutor(
-                max_workers=min(len(self.task_data), 10)
-            ) as executor:
-                future_to_data = {
-                    executor.submit(self._process_task_iteration, data): data
-                    for data in self.task_data
-                }
-                for future in concurrent.futures.as_completed(future_to_data):
-                    try:
-                        result = future.result()
-                        if not result:
-                            self.logger.error(
-                                f"Task {self.task_id} completed with errors"
-                            )
-
-                        # Если таск без внутреннего многопоточного процесса был отменён
-                        # Отменяем все незапущенные задачи
-                        if self.is_stopped:
-                            for f in future_to_data.keys():
-                                f.cancel()
-
-                    except concurrent.futures.TimeoutError:
-                        self.logger.error("Timeout error for get result in run_task")
-                        continue
-                    except Exception as exc:
-                        self.logger.error(f"Task generated an exception: {exc}")
+            self._run_iterations(items)
+            self.completed = not self.is_stopped
 
         except Exception as e:
             self.logger.error(f"Error during task {self.task_id}: {e}")
         finally:
-            # Закрытие старых соединений по окончанию задачи
-            # close_old_connections()
+            self._finish_task()
 
-            # Принудительно вызываем сборщик мусора
-            # gc.collect()
+        return self.result
+
+    def _finish_task(self):
+        if self.checkpoint:
+            # Точка нужна только незавершённой задаче
+            if self.completed or self.is_stopped:
+                self.checkpoint.clear()
+            else:
+                self.checkpoint.flush()
+
+        # Закрытие старых соединений по окончанию задачи
+        # close_old_connections()
 
+        # Принудительно вызываем сборщик мусора
+        # gc.collect()
+
+        if self.chunk_progress is None:
             # Отправляем юзеру уведомление завершения таска
-            msg = (f"Задача {str(self.name)} [{truncate_id(self.task_id)}] завершена. \n"
-                   f"Обработано: {self.total_iterations} \n"
-                   f"Успешных: {self.count_success} \n"
-                   f"Неудачных: {self.count_failed}")
+            msg = task_summary(self.name, self.task_id, self.counters.snapshot())
             send_notification_to_user.delay(self.user_id, msg)
 
             # Финальный статус WebSocket
             self._send_task_result(message="Completed", progress=100, save_log=True, process_type="process_finished")
+        elif self.parent_task_id:
+            # Итог части попадает в общие счётчики,
+            # сводку отправит finish_chunked_task после всех частей
+            self.chunk_progress.totals(self.counters.snapshot(), force=True)
+
+        self.publisher.close()
+        self.bookkeeping.flush()
+        self.archive_writer.close()
+        cancellation_listener.unregister(self.task_id, self.cancel_flag)
+        memo.report_stats()
+
+        if self.profiler.enabled:
+            profile = self.profiler.summary()
+            self.result["profile"] = profile
+            self.logger.info(f"Task {self.task_id} profile: {json.dumps(profile)}")
+
+    def _dispatch_chunks(self, items: Iterator, args: tuple, kwargs: dict) -> None:
+        """
+        Отправляет данные частями в отдельные задачи. Части публикуют
+        прогресс в group_{task_id} родителя с общими счётчиками и
+        отменяются вместе с ним, итог отправляет finish_chunked_task.
+        """
+        chunks = list(iter_chunks(items, self.chunk_size or settings.TASK_CHUNK_SIZE))
+        total_steps = self.dynamic_total_steps or sum(len(chunk) for chunk in chunks)
 
-        return self.result
+        self.chunk_progress = ChunkProgress(self.task_id)
+        self.chunk_progress.init(total_steps, len(chunks))
+
+        header = group(
+            self.si(*args, **{**kwargs, "parent_task_id": self.task_id, "chunk": chunk})
+            for chunk in chunks
+        )
+        callback = signature(
+            "websocket.tasks.finish_chunked_task",
+            args=(self.task_id, self.user_id, self.name),
+            immutable=True,
+        )
+        chord(header)(callback)
+
+        self._send_task_result(message=f"Task split into {len(chunks)} chunks")
+        self.logger.info(f"Task {self.task_id} dispatched {len(chunks)} chunks")
+
+    def create_concurrency_controller(self, data) -> ConcurrencyController:
+        """
+        Контроллер одновременных итераций с лимитами задачи.
+        Больше итераций, чем элементов в данных, не запускается.
+        """
+        max_limit = self.max_concurrency()
+        if hasattr(data, "__len__"):
+            max_limit = min(len(data), max_limit)
+        return create_controller(
+            self.concurrency_controller_class,
+            initial=min(self.concurrency_initial or settings.TASK_CONCURRENCY_INITIAL, max_limit),
+            min_limit=self.concurrency_min,
+            max_limit=max_limit,
+        )
+
+    def max_concurrency(self) -> int:
+        """
+        Верхний лимит одновременных итераций. Итерации выполняются
+        в отдельных потоках со своими соединениями с БД, поэтому при
+        включённом пуле их не больше, чем свободных соединений в нём
+        (одно держит основной поток задачи, одно - ArchiveWriter).
+        """
+        max_limit = self.concurrency_max or settings.TASK_CONCURRENCY_MAX
+        if settings.DB_POOL_ENABLED:
+            max_limit = min(max_limit, max(1, settings.DB_POOL_MAX_SIZE - 2))
+        return max_limit
+
+    def classify_failure(self, exc: BaseException) -> str:
+        """
+        Вид неудачи итерации для контроллера параллелизма.
+        Таймауты и rate limit внешнего сервиса снижают лимит сразу.
+        Итерация может сообщить о них и сама:
+        self.concurrency.on_failure(FAILURE_RATE_LIMIT).
+        """
+        if isinstance(exc, (TimeoutError, httpx.TimeoutException)):
+            return FAILURE_TIMEOUT
+        if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+            return FAILURE_RATE_LIMIT
+        return FAILURE_ERROR
+
+    def _report_iteration(
+        self, started: float, data, result=None, exc=None, counters: dict | None = None
+    ) -> None:
+        """
+        Передаёт контроллеру результат и длительность итерации,
+        отмечает элемент обработанным в контрольной точке вместе
+        с увеличениями счётчиков, сделанными итерацией (counters)
+        """
+        latency = time.monotonic() - started
+        if exc is not None:
+            self.logger.error(f"Task generated an exception: {exc}")
+            self.concurrency.on_failure(self.classify_failure(exc), latency)
+            # Элемент с исключением при возобновлении выполнится снова
+            return
+        if not result:
+            self.logger.error(f"Task {self.task_id} completed with errors")
+            self.concurrency.on_failure(FAILURE_ERROR, latency)
+        else:
+            self.concurrency.on_success(latency)
+
+        if self.checkpoint and (item_key := self.get_item_key(data)) is not None:
+            if self.checkpoint.mark(str(item_key), counters or {}):
+                self.checkpoint.flush()
+
+    def _run_iterations(self, items: Iterator) -> None:
+        """
+        Выполняет итерации в пуле потоков, держа в работе не больше
+        self.concurrency.limit задач: новые данные берутся из items
+        по мере завершения предыдущих, поэтому память не зависит
+        от общего объёма данных. Лимит меняется контроллером по
+        задержке и ошибкам итераций.
+        """
+        max_workers = self.concurrency.max_limit
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # {future: (время запуска, данные)}
+            in_flight = {}
+            source_error = None
+
+            def refill():
+                nonlocal source_error
+                # После отмены новые итерации не запускаются, даже если
+                # stop_task() ещё не вызван
+                while (
+                    len(in_flight) < self.concurrency.limit
+                    and not self.is_stopped
+                    and not self.cancel_flag.is_set()
+                ):
+                    # Ошибку источника данных пробрасываем, только дождавшись
+                    # и учтя уже запущенные итерации
+                    if source_error:
+                        return
+                    try:
+                        data = next(items, _NO_DATA)
+                    except Exception as e:
+                        source_error = e
+                        return
+                    if data is _NO_DATA:
+                        return
+                    future = executor.submit(
+                        self._profiled_iteration, data, time.perf_counter()
+                    )
+                    in_flight[future] = (time.monotonic(), data)
+
+            self._refill(refill)
+            while in_flight:
+                done, _ = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    started, data = in_flight.pop(future)
+                    if future.cancelled():
+                        continue
+                    if exc := future.exception():
+                        self._report_iteration(started, data, exc=exc)
+                    else:
+                        result, counters = future.result()
+                        self._report_iteration(started, data, result=result, counters=counters)
+
+                # Отмена с фронта: сообщаем клиенту, если итерации этого
+                # ещё не сделали, и снимаем все незапущенные задачи
+                if self.cancel_flag.is_set() and not self.is_stopped:
+                    self.stop_task()
+                if self.is_stopped:
+                    for future in in_flight:
+                        future.cancel()
+                    continue
+
+                self._refill(refill)
+
+        if source_error:
+            raise source_error
 
     def setup_task(self, *args, **kwargs):
         """
         Инициализация параметров задачи.
         Переопределяется в дочерних классах при необходимости.
         """
-        self.task_id = self.request.id
+        # Часть разбитой задачи публикует прогресс, пишет журнал
+        # и слушает отмену под id родителя
+        self.parent_task_id = kwargs.get("parent_task_id")
+        self.chunk_data = kwargs.get("chunk")
+        self.chunk_progress = (
+            ChunkProgress(self.parent_task_id) if self.parent_task_id else None
+        )
+        self.task_id = self.parent_task_id or self.request.id
         self.group_name = f"group_{self.task_id}"
+        self.publisher = TaskProgressPublisher(
+            self.task_id, self.group_name, self.channel_layer
+        )
+        self.profiler = TaskProfiler()
+        self.archive_writer = ArchiveWriter(profiler=self.profiler)
+        self.bookkeeping = TaskBookkeeping(self.task_id, profiler=self.profiler)
         self.user_id = kwargs.get("user_id")
         self.user = User.objects.filter(id=kwargs.get("user_id")).first()
 
+        self.concurrency = None
+        # Экземпляр задачи переиспользуется Celery между запусками
+        self.counters.reset()
+        self.completed = False
+        self.checkpoint = None
+        if self.checkpoint_enabled:
+            self.checkpoint = TaskCheckpoint(self.get_job_key(*args, **kwargs))
+            if self.checkpoint.load():
+                # Продолжаем прерванную задачу с сохранёнными счётчиками
+                self.counters.reset(self.checkpoint.counters)
+                self.logger.info(
+                    f"Task {self.task_id} resumed from checkpoint {self.checkpoint.job_key}: "
+                    f"{len(self.checkpoint.done)} items already done"
+                )
+
+        # Флаг отмены выставляет слушатель канала отмены (см. stop_task во views)
+        self.is_stopped = False
+        self.cancel_flag = threading.Event()
+        cancellation_listener.register(self.task_id, self.cancel_flag)
+
+    def get_job_key(self, *args, **kwargs) -> str:
+        """
+        Ключ логической задачи для контрольной точки. По умолчанию id
+        задачи Celery (совпадает при повторной доставке того же
+        сообщения) или переданный при запуске job_key.
+        """
+        return kwargs.get("job_key") or self.request.id
+
+    def get_item_key(self, data) -> Optional[str]:
+        """
+        Ключ элемента данных для контрольной точки.
+        По умолчанию data["id"]; None - элемент не отмечается.
+        """
+        if isinstance(data, dict):
+            return data.get("id")
+        return None
+
+    def is_checkpointed(self, data) -> bool:
+        item_key = self.get_item_key(data)
+        return item_key is not None and self.checkpoint.is_done(str(item_key))
+
     def generate_data(self):
         """
         Генерация данных для выполнения задачи.
-        Переопределяется в дочерних классах.
+        Переопределяется в дочерних классах: заполняет self.task_data
+        или возвращает итератор (например, генератор), который читается
+        по мере выполнения итераций.
         """
         raise NotImplementedError(
             "Method 'generate_data' must be implemented in subclass"
@@ -158,22 +472,41 @@ class BaseTaskRunner(Task):
         Проверяем что таск не отменён клиентов
         Если отменён то отправляем сообщение на клиент и возвращаем True
         """
-        if AsyncResult(self.task_id).state == "REVOKED":
-            self._send_task_result(
-                process_type="task_canceled",
-                message=f"Task {self.task_id} was revoked by user.",
-                save_log=True,
-            )
+        if self.cancel_flag.is_set():
+            # Кадр и запись об отмене отправляет только stop_task, один раз
+            self.stop_task()
             return True
         return None
 
+    def _refill(self, refill) -> None:
+        # Ленивый generate_data отдаёт данные при дозаполнении окна
+        with self.profiler.phase("generate_data", always=True):
+            refill()
+
+    def _profiled_iteration(self, data, submitted: float) -> tuple:
+        """
+        Итерация в потоке пула с замером ожидания в очереди.
+        Возвращает результат и увеличения счётчиков за итерацию
+        """
+        try:
+            with self.profiler.iteration(), self.counters.track() as counters:
+                self.profiler.record_wait("queue_wait", time.perf_counter() - submitted)
+                return self._process_task_iteration(data), counters
+        finally:
+            # Соединение потока пула: в режиме DB_POOL_ENABLED возвращается
+            # в пул, иначе закрывается, только если устарело
+            close_old_connections()
+
     def _process_task_iteration(self, data):
         """
         Обрабатывает одну итерацию задачи.
         Возвращает True если успешно, или False при неудаче.
         """
-        if self.verification(data):
-            return self.action_runer(data)
+        with self.profiler.phase("verification"):
+            verified = self.verification(data)
+        if verified:
+            with self.profiler.phase("action_runer"):
+                return self.action_runer(data)
         else:
             self.logger.error(f"Data verification failed: {data}")
             return False
@@ -188,38 +521,30 @@ class BaseTaskRunner(Task):
             notification_type = None
 
             if error_msg := response.get_text_error():
-                # Обёртка в транзакцию для надёжной обработки
-                with transaction.atomic():
-                    if error_msg == NotificationType.ACCESS_DENIED.label:
-                        notification_type = NotificationType.ACCESS_DENIED
-                    if error_msg == NotificationType.UNKNOWN_ACCESS_DENIED.label:
-                        notification_type = NotificationType.UNKNOWN_ACCESS_DENIED
-
-                    if error_msg == NotificationType.WRONG_USER.label:
-                        notification_type = NotificationType.WRONG_USER
-
-                    if error_msg == NotificationType.FAIL_FETCH_SESSION.label:
-                        notification_type = NotificationType.FAIL_FETCH_SESSION
-
-                    if error_msg == NotificationType.VERIFICATION_ACCOUNT_ERROR.label:
-                        notification_type = NotificationType.VERIFICATION_ACCOUNT_ERROR
-
-                    if error_msg == NotificationType.PAID_SUBSCRIPTION_ERROR.label:
-                        notification_type = NotificationType.PAID_SUBSCRIPTION_ERROR
-
-                    if error_msg == NotificationType.RESTRICTED_WORDS.label:
-                        notification_type = NotificationType.RESTRICTED_WORDS
-
-                    # Получаем или создаём уведомление для данного аккаунта и типа
-                    if notification_type:
-                        notification, _ = AccountNotification.objects.get_or_create(
-                            account=account,
-                            notification_type=notification_type,
-                            task_id=self.task_id,
-                            defaults={"counter": 1},
-                        )
-                        # Увеличиваем счётчик или сбрасываем его
-                        notification.increment_or_reset()
+                if error_msg == NotificationType.ACCESS_DENIED.label:
+                    notification_type = NotificationType.ACCESS_DENIED
+                if error_msg == NotificationType.UNKNOWN_ACCESS_DENIED.label:
+                    notification_type = NotificationType.UNKNOWN_ACCESS_DENIED
+
+                if error_msg == NotificationType.WRONG_USER.label:
+                    notification_type = NotificationType.WRONG_USER
+
+                if error_msg == NotificationType.FAIL_FETCH_SESSION.label:
+                    notification_type = NotificationType.FAIL_FETCH_SESSION
+
+                if error_msg == NotificationType.VERIFICATION_ACCOUNT_ERROR.label:
+                    notification_type = NotificationType.VERIFICATION_ACCOUNT_ERROR
+
+                if error_msg == NotificationType.PAID_SUBSCRIPTION_ERROR.label:
+                    notification_type = NotificationType.PAID_SUBSCRIPTION_ERROR
+
+                if error_msg == NotificationType.RESTRICTED_WORDS.label:
+                    notification_type = NotificationType.RESTRICTED_WORDS
+
+                # Уведомление для аккаунта и типа создастся или его счётчик
+                # увеличится при пакетной записи
+                if notification_type:
+                    self.bookkeeping.add_account_notification(account, notification_type)
 
     def _send_task_result(
         self,
@@ -233,43 +558,62 @@ class BaseTaskRunner(Task):
         data=None,
         save_log=False,
     ):
+        counters, total_steps = self._progress_counters()
         self.result = {
             "type": process_type,
+            "task_id": self.task_id,
             "message": message,
             "message_error": message_error,
             "progress": (
                 progress
                 if progress
                 else (
-                    int((self.progress / self.dynamic_total_steps) * 100)
-                    if self.dynamic_total_steps > 0
+                    int((counters["progress"] / total_steps) * 100)
+                    if total_steps > 0
                     else 0
                 )
             ),
-            "iteration": iteration if iteration else self.total_iterations,
+            "iteration": iteration if iteration else counters["iterations"],
             "success_iteration": (
-                success_iteration if success_iteration else self.count_success
+                success_iteration if success_iteration else counters["success"]
             ),
             "error_iteration": (
-                error_iteration if error_iteration else self.count_failed
+                error_iteration if error_iteration else counters["failed"]
             ),
             "data": data if data else None,
+            "concurrency": self.concurrency.limit if self.concurrency else None,
         }
-        async_to_sync(self.channel_layer.group_send)(
-            self.group_name,
-            self.result,
-        )
+        # Промежуточные события схлопываются, финальные уходят сразу
+        with self.profiler.phase("publish"):
+            self.publisher.publish(frame_event(process_type, task_payload(self.result)))
 
         # Создаем новую запись в таблице Archive
         if (message_error or message) and self.user and save_log:
             self.save_log()
 
+    def incr_success(self, n: int = 1) -> None:
+        self.counters.success.incr(n)
+
+    def incr_failed(self, n: int = 1) -> None:
+        self.counters.failed.incr(n)
+
+    def incr_progress(self, n: int = 1) -> None:
+        self.counters.progress.incr(n)
+
+    def incr_iterations(self, n: int = 1) -> None:
+        self.counters.iterations.incr(n)
+
+    def _progress_counters(self) -> tuple[dict[str, int], int]:
+        """Счётчики и число шагов для кадра прогресса (у части - общие для задачи)"""
+        counters = self.counters.snapshot()
+        if self.parent_task_id:
+            return self.chunk_progress.totals(counters), self.chunk_progress.total_steps
+        return counters, self.dynamic_total_steps
+
     def send_finally_iteration_result(self, executor, list_data, index):
-        self.progress += 1
-        self.total_iterations += 1
-        self._send_task_result(
-            progress=int((self.progress / self.dynamic_total_steps) * 100), process_type="process_finished"
-        )
+        self.incr_progress()
+        self.incr_iterations()
+        self._send_task_result(process_type="process_finished")
 
         if self.check_skipped_rules(list_data, index):
             executor.shutdown(wait=False, cancel_futures=True)
@@ -278,26 +622,31 @@ class BaseTaskRunner(Task):
         return None
 
     def save_log(self):
-        try:
-            Archive.objects.create(
+        # Запись сохранит ArchiveWriter пачкой вместе с остальными
+        self.archive_writer.add(
+            Archive(
                 user=self.user,
                 task_id=self.task_id,
                 message=self.result.get("message", self.result.get("message_error")),
                 status=not bool(self.result.get("message_error")),
                 additional=self.result.get("data", {}),
             )
-        except Exception as e:
-            self.logger.error(f"Failed to create archive record: {e}")
+        )
 
     def stop_task(self):
-        # Прерываем если была команда с фронта
-        if AsyncResult(self.task_id).state == "REVOKED":
+        # Прерываем если была команда с фронта. Вызывается и из потоков
+        # итераций (check_skipped_rules), поэтому отмена сообщается один раз
+        with self._stop_lock:
+            if self.is_stopped or not self.cancel_flag.is_set():
+                return
             self.is_stopped = True
             self._send_task_result(
                 process_type="task_canceled",
                 message=f"Task {self.task_id} was revoked by user.",
                 save_log=True,
             )
+            # Запись об отмене сохраняем сразу
+            self.archive_writer.flush()
 
     def _check_internal_response(
         self,
@@ -307,21 +656,17 @@ class BaseTaskRunner(Task):
         save_invalid_target: bool = False,
     ) -> bool:
         if not response or response.success is not True:
-            self.count_failed += 1
+            self.incr_failed()
             msg = response.get_text_error() if response else error_msg
             self._send_task_result(
                 message=msg,
                 save_log=True,
             )
 
-            skipped_types = get_invalid_target_skipped_types()
+            skipped_types = skipped_target_types()
 
             if save_invalid_target and msg not in skipped_types and target:
-                InvalidTarget.objects.update_or_create(
-                    username=target.get("username"),
-                    of_id=target.get("id"),
-                    defaults={"desc": msg},
-                )
+                self.bookkeeping.add_invalid_target(target, msg)
 
             if isinstance(response, InternalVerificationResponse) and target:
                 if (
@@ -329,17 +674,21 @@ class BaseTaskRunner(Task):
                     and response.save_invalid_target
                     and msg not in skipped_types
                 ):
-                    InvalidTarget.objects.update_or_create(
-                        username=target.get("username"),
-                        of_id=target.get("id"),
-                        defaults={"desc": msg},
-                    )
+                    self.bookkeeping.add_invalid_target(target, msg)
 
             return True
 
         return False
 
 
+def task_summary(name, task_id, counters: dict[str, int]) -> str:
+    """Текст уведомления о завершении задачи"""
+    return (f"Задача {str(name)} [{truncate_id(task_id)}] завершена. \n"
+            f"Обработано: {counters['iterations']} \n"
+            f"Успешных: {counters['success']} \n"
+            f"Неудачных: {counters['failed']}")
+
+
 def truncate_id(task_id, length=5):
     if len(task_id) <= (length * 2 + 3):
         return task_id
@@ -0,0 +1,90 @@
+import logging
+
+from celery import current_app, shared_task, states
+from celery.result import AsyncResult
+
+from app.services.result_backend import HybridResultBackend
+from archive.models import Archive
+from websocket.consumers import send_notification_to_user
+from websocket.services.cancellation import is_cancel_requested
+from websocket.services.chunks import ChunkProgress
+from websocket.services.frames import frame_event, task_payload
+from websocket.services.publisher import TaskProgressPublisher
+from websocket.services.task import task_summary
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def finish_chunked_task(parent_task_id, user_id, task_name):
+    """
+    Завершение задачи, выполненной частями (BaseTaskRunner.chunked):
+    одна сводка пользователю и финальный кадр по общим счётчикам.
+    Если задачу отменили, вместо сводки отправляется task_canceled.
+    """
+    progress = ChunkProgress(parent_task_id)
+    counters = progress.read()
+
+    if canceled := is_cancel_requested(parent_task_id):
+        process_type = "task_canceled"
+        message = f"Task {parent_task_id} was revoked by user."
+    else:
+        process_type = "process_finished"
+        message = "Completed"
+        send_notification_to_user.delay(user_id, task_summary(task_name, parent_task_id, counters))
+
+    result = {
+        "type": process_type,
+        "task_id": parent_task_id,
+        "message": message,
+        "message_error": "",
+        "progress": _percent(counters["progress"], progress.read_total_steps()) if canceled else 100,
+        "iteration": counters["iterations"],
+        "success_iteration": counters["success"],
+        "error_iteration": counters["failed"],
+        "data": None,
+    }
+    publisher = TaskProgressPublisher(parent_task_id, f"group_{parent_task_id}")
+    publisher.publish(frame_event(process_type, task_payload(result)))
+    publisher.close()
+
+    Archive.objects.create(
+        user_id=user_id,
+        task_id=parent_task_id,
+        message=message,
+        status=True,
+        additional=None,
+    )
+    progress.clear()
+    return result
+
+
+def _percent(done: int, total: int) -> int:
+    return int(done / total * 100) if total > 0 else 0
+
+
+@shared_task(ignore_result=True)
+def terminate_cancelled_task(task_id):
+    """
+    Запасной вариант отмены: задача, которая за TASK_CANCEL_TERMINATE_AFTER
+    секунд не завершилась сама по флагу отмены, останавливается сигналом.
+    Буферы задачи (Archive, bookkeeping, прогресс) при этом теряются.
+    """
+    if AsyncResult(task_id).state in states.READY_STATES:
+        return
+    logger.warning(f"Task {task_id} did not stop after cancel, terminating")
+    current_app.control.revoke(task_id, terminate=True)
+
+
+@shared_task(ignore_result=True)
+def archive_task_results():
+    """
+    Перенос завершённых результатов задач из Redis в историю
+    (django_celery_results), см. HybridResultBackend
+    """
+    backend = current_app.backend
+    if not isinstance(backend, HybridResultBackend):
+        return
+    archived = backend.archive()
+    if archived:
+        logger.info(f"Archived {archived} task results")
@@ -1,3 +1,69 @@
-from django.test import TestCase
+import concurrent.futures
+import threading
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from websocket.services.counters import CounterField, ShardedCounter, TaskCounters
+
+
+class _Runner:
+    count_success = CounterField("success")
+
+    def __init__(self):
+        self.counters = TaskCounters()
+
+
+class ShardedCounterTests(SimpleTestCase):
+    threads = 16
+    iterations = 5000
+
+    def _hammer(self, func):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.threads) as executor:
+            for _ in range(self.threads):
+                executor.submit(lambda: [func() for _ in range(self.iterations)])
+
+    def test_incr_is_exact_under_contention(self):
+        counter = ShardedCounter()
+        self._hammer(counter.incr)
+        self.assertEqual(counter.value, self.threads * self.iterations)
+
+    def test_augmented_assignment_is_exact_under_contention(self):
+        runner = _Runner()
+
+        def step():
+            runner.count_success += 1
+
+        self._hammer(step)
+        self.assertEqual(runner.count_success, self.threads * self.iterations)
+
+    def test_plain_assignment_resets(self):
+        runner = _Runner()
+        runner.counters.success.incr(5)
+        runner.count_success = 0
+        self.assertEqual(runner.count_success, 0)
+        runner.counters.reset()
+        self.assertEqual(runner.counters.success.value, 0)
+
+    def test_plain_assignment_after_augmented_assignment_resets(self):
+        runner = _Runner()
+        runner.count_success += 3
+        # Увеличение из другого потока между `+=` и присваиванием
+        thread = threading.Thread(target=runner.counters.success.incr, args=(10,))
+        thread.start()
+        thread.join()
+        runner.count_success = 0
+        self.assertEqual(runner.count_success, 0)
+        runner.count_success += 2
+        self.assertEqual(runner.count_success, 2)
+
+    def test_track_collects_only_current_thread_increments(self):
+        runner = _Runner()
+        with runner.counters.track() as tracked:
+            runner.count_success += 2
+            # Итерация в другом потоке не попадает во вклад текущей
+            thread = threading.Thread(target=runner.counters.success.incr, args=(10,))
+            thread.start()
+            thread.join()
+        runner.count_success += 1
+        self.assertEqual(tracked, {"success": 2})
+        self.assertEqual(runner.count_success, 13)
@@ -5,11 +5,35 @@ from websocket.views import (
     StartFindRecommendTargetsTask,
     StartSendCommentsTask,
     StartFindFriendsTargetsTask,
+    WebsocketConnectionsView,
+    MemoStatsView,
+    CeleryTelemetryView,
+    CeleryQueuesView,
 )
 
 urlpatterns = [
     path("task-status/<str:task_id>/", task_status, name="task_status"),
     path("stop-task/<str:task_id>/", stop_task, name="stop_task"),
+    path(
+        "connections/",
+        WebsocketConnectionsView.as_view(),
+        name="websocket_connections",
+    ),
+    path(
+        "memo-stats/",
+        MemoStatsView.as_view(),
+        name="memo_stats",
+    ),
+    path(
+        "celery-telemetry/",
+        CeleryTelemetryView.as_view(),
+        name="celery_telemetry",
+    ),
+    path(
+        "celery-queues/",
+        CeleryQueuesView.as_view(),
+        name="celery_queues",
+    ),
     path(
         "task/target/find_recommend/",
         StartFindRecommendTargetsTask.as_view(),
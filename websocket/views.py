@@ -4,12 +4,20 @@ from celery import Task
 from celery.result import AsyncResult
 from django.http import JsonResponse
 from rest_framework import permissions
+from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from target.tasks import run_recommend_task, run_friend_task
 from sender.tasks import run_comment_task
 
+from app import settings
+from app.services.celery_telemetry import get_queue_depths, get_task_telemetry
 from authenticate.serializers import UserSerializer
+from websocket.services.cancellation import request_cancel
+from websocket.services.heartbeat import get_connections_by_worker
+from websocket.services.memo import get_memo_stats_by_worker
+from websocket.services.snapshots import get_snapshot
+from websocket.tasks import terminate_cancelled_task
 
 logger = logging.getLogger(__name__)
 
@@ -82,7 +90,8 @@ class StartSendCommentsTask(BaseTaskView):
 def task_status(request, task_id):
     """
     Проверяет статус задачи в Celery по ее `task_id`.
-    Возвращает JSON с текущим состоянием и результатом (если доступно).
+    Возвращает JSON с текущим состоянием, результатом (если доступно)
+    и последним снимком прогресса из WebSocket-потока задачи.
     """
     try:
         # Создаем AsyncResult для задачи
@@ -116,6 +125,8 @@ def task_status(request, task_id):
                 "error": str(result.result) if result.state == "FAILURE" else None,
             }
 
+        response["snapshot"] = get_snapshot(task_id)
+
         return JsonResponse(response)  # Возвращаем JSON
 
     except Exception as e:
@@ -125,10 +136,75 @@ def task_status(request, task_id):
 
 def stop_task(request, task_id):
     try:
-        Task.app.control.revoke(task_id, terminate=True)
+        # Выполняющийся таск узнаёт об отмене через канал отмены в Redis
+        # и сам завершается с сохранением буферов. revoke без terminate
+        # снимает задачу, которая ещё стоит в очереди: terminate убил бы
+        # процесс воркера раньше, чем задача обработает отмену
+        request_cancel(task_id)
+        Task.app.control.revoke(task_id)
+        if settings.TASK_CANCEL_TERMINATE_AFTER:
+            terminate_cancelled_task.apply_async(
+                (task_id,), countdown=settings.TASK_CANCEL_TERMINATE_AFTER
+            )
         logger.warning(f"Task {task_id} stopped from user successfully")
         return JsonResponse(
             {"status": True, "message": "Task stopped successfully", "task_id": task_id}
         )
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
+
+
+class WebsocketConnectionsView(APIView):
+    """
+    Количество открытых WebSocket-соединений по процессам ASGI.
+    Доступно только администраторам.
+    """
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        workers = get_connections_by_worker()
+        return Response({"total": sum(workers.values()), "workers": workers})
+
+
+class MemoStatsView(APIView):
+    """
+    Попадания и промахи кэшей справочных данных задач
+    (websocket.services.memo) по процессам воркеров.
+    Доступно только администраторам.
+    """
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_memo_stats_by_worker())
+
+
+class CeleryTelemetryView(APIView):
+    """
+    Телеметрия задач Celery по именам за последние 1/5/15/60 минут:
+    время выполнения, ожидание в очереди, ошибки, повторы, память и БД.
+    Доступно только администраторам.
+    """
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_task_telemetry())
+
+
+class CeleryQueuesView(APIView):
+    """
+    Глубина очередей Celery (realtime, default, bulk) по приоритетам
+    и время ожидания самого старого сообщения.
+    Доступно только администраторам.
+    """
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_queue_depths())